@@ -1,3 +1,4 @@
+from cacp.cache import TaskCache
 from cacp.dataset import \
     ClassificationDatasetMinimalBase, \
     ClassificationDatasetBase, \
@@ -7,7 +8,10 @@ from cacp.dataset import \
     ClassificationFoldData, \
     all_datasets
 
-from cacp.run import run_experiment, run_incremental_experiment
+from cacp.curve import CurveRecording
+from cacp.halving import ClassifierGrid, SuccessiveHalving
+from cacp.racing import Racing
+from cacp.run import run_experiment, run_incremental_experiment, recompute_metrics
 
 __all__ = [
     'ClassificationDatasetMinimalBase',
@@ -18,5 +22,11 @@ __all__ = [
     'ClassificationFoldData',
     'all_datasets',
     'run_experiment',
-    'run_incremental_experiment'
+    'run_incremental_experiment',
+    'recompute_metrics',
+    'TaskCache',
+    'Racing',
+    'ClassifierGrid',
+    'SuccessiveHalving',
+    'CurveRecording'
 ]
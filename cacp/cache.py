@@ -0,0 +1,218 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import platform
+import tempfile
+import typing
+from pathlib import Path
+
+import numpy as np
+
+from cacp.dataset import ClassificationFoldData
+
+TASK_CACHE_VERSION = 1
+
+# libraries that can change classifier results
+_VERSIONED_PACKAGES = ('cacp', 'numpy', 'scikit-learn', 'river')
+
+
+@functools.lru_cache(maxsize=None)
+def _library_versions() -> typing.Tuple[typing.Tuple[str, str], ...]:
+    from importlib import metadata
+    versions = [('python', platform.python_version())]
+    for package in _VERSIONED_PACKAGES:
+        try:
+            versions.append((package, metadata.version(package)))
+        except metadata.PackageNotFoundError:
+            versions.append((package, '-'))
+    return tuple(versions)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_digest(cls: type) -> str:
+    # custom classifiers can change code without changing their name
+    try:
+        return hashlib.sha1(inspect.getsource(cls).encode()).hexdigest()
+    except (OSError, TypeError):
+        return '-'
+
+
+def classifier_fingerprint(model) -> dict:
+    """
+    Creates stable description of classifier type, its code and parameters.
+
+    :param model: classifier instance
+    :return: JSON serializable classifier description
+
+    """
+    cls = type(model)
+    if hasattr(model, 'get_params'):  # sklearn
+        params = model.get_params(deep=False)
+    elif hasattr(model, '_get_params'):  # river
+        params = model._get_params()
+    else:
+        params = {k: v for k, v in vars(model).items() if not k.startswith('_')}
+    return {
+        'type': f'{cls.__module__}.{cls.__qualname__}',
+        'source': _source_digest(cls),
+        'params': json.loads(json.dumps(params, sort_keys=True, default=_param_default)),
+    }
+
+
+def _param_default(value):
+    if inspect.isclass(value) or inspect.isfunction(value):
+        return f'{value.__module__}.{value.__qualname__}'
+    if hasattr(value, 'get_params') or hasattr(value, '_get_params'):
+        return classifier_fingerprint(value)
+    return repr(value)
+
+
+def fold_digest(fold: ClassificationFoldData) -> str:
+    """
+    Calculates digest of fold content, so the same data gives the same digest regardless of dataset name,
+    folds settings or modifiers that produced it.
+
+    :param fold: fold data
+    :return: fold digest
+
+    """
+    hasher = hashlib.sha1()
+    for name in ('x_train', 'y_train', 'x_test', 'y_test', 'labels'):
+        array = np.asarray(getattr(fold, name))
+        hasher.update(f'{name}:{array.dtype.str}:{array.shape}'.encode())
+        if array.dtype.hasobject:
+            hasher.update(repr(array.tolist()).encode())
+        else:
+            hasher.update(np.ascontiguousarray(array).tobytes())
+    return hasher.hexdigest()
+
+
+class TaskCache:
+    """
+    Content-addressed cache of finished comparison tasks shared between experiments. Task is identified by
+    classifier type, code and parameters, fold content, random seed and versions of libraries, cache stores
+    its predictions and timings, so metrics are always calculated for current experiment.
+    Least recently used entries are removed when cache exceeds its size.
+    """
+
+    def __init__(self, directory: typing.Optional[Path] = None, max_size_mb: typing.Optional[float] = 1024,
+                 max_entries: typing.Optional[int] = None):
+        """
+        Initializes task cache.
+
+        :param directory: cache directory, defaults to task_cache in cacp files directory
+        :param max_size_mb: maximum size of cache in megabytes, None for no limit
+        :param max_entries: maximum number of cached tasks, None for no limit
+        """
+        self.directory = Path(directory) if directory else Path.home().joinpath('cacp_files', 'task_cache')
+        self.directory.mkdir(exist_ok=True, parents=True)
+        self.max_size_mb = max_size_mb
+        self.max_entries = max_entries
+
+    def key(self, model, fold_hash: str, seed: typing.Optional[int] = None) -> str:
+        """
+        Calculates task key.
+
+        :param model: classifier instance created for task
+        :param fold_hash: fold digest
+        :param seed: random seed of experiment
+        :return: task key
+        """
+        description = {
+            'version': TASK_CACHE_VERSION,
+            'classifier': classifier_fingerprint(model),
+            'fold': fold_hash,
+            'seed': seed,
+            'libraries': _library_versions(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory.joinpath(key[:2], f'{key}.npz')
+
+    def entry(self, key: str) -> Path:
+        """
+        Gets cache entry path of task, existing entry is marked as recently used.
+
+        :param key: task key
+        :return: cache entry path
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def evict(self):
+        """
+        Removes least recently used entries until cache fits in its limits.
+        """
+        entries = []
+        for path in self.directory.glob('*/*.npz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        n_entries = len(entries)
+        max_size = None if self.max_size_mb is None else self.max_size_mb * 1024 * 1024
+        for _, size, path in entries:
+            too_large = max_size is not None and total_size > max_size
+            too_many = self.max_entries is not None and n_entries > self.max_entries
+            if not too_large and not too_many:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            n_entries -= 1
+
+    def clear(self):
+        for path in self.directory.glob('*/*.npz'):
+            path.unlink(missing_ok=True)
+
+
+def store_task(path: Path, info: dict, pred: np.ndarray, proba: typing.Optional[np.ndarray] = None,
+               proba_classes: typing.Optional[np.ndarray] = None):
+    """
+    Stores finished task in cache entry, entry is replaced atomically, so concurrent workers never see partial file.
+
+    :param path: cache entry path
+    :param info: task metadata, eg. timings
+    :param pred: predictions
+    :param proba: class probabilities
+    :param proba_classes: classes of probabilities columns
+    """
+    path.parent.mkdir(exist_ok=True, parents=True)
+    arrays = {'y_pred': np.asarray(pred), 'info': np.array(json.dumps(info, default=str))}
+    if proba is not None:
+        arrays['proba'] = np.asarray(proba)
+        if proba_classes is not None:
+            arrays['proba_classes'] = np.asarray(proba_classes)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def load_task(path: Path) -> typing.Tuple[dict, np.ndarray, typing.Optional[np.ndarray], typing.Optional[np.ndarray]]:
+    """
+    Loads cached task.
+
+    :param path: cache entry path
+    :return: task metadata, predictions, class probabilities and their classes
+    """
+    with np.load(path, allow_pickle=True) as entry:
+        return (
+            json.loads(str(entry['info'])),
+            entry['y_pred'],
+            entry['proba'] if 'proba' in entry.files else None,
+            entry['proba_classes'] if 'proba_classes' in entry.files else None,
+        )
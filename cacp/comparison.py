@@ -1,19 +1,30 @@
+import dataclasses
 import inspect
-import os
+import itertools
 import typing
 from pathlib import Path
 from timeit import default_timer as timer
 
+import numpy as np
 import pandas as pd
 import river
-from joblib import delayed, Parallel
-from river import metrics as river_metrics, stream, utils
+from joblib import delayed
+from river import metrics as river_metrics, utils
 from river.datasets.base import Dataset
+from threadpoolctl import threadpool_limits
 from tqdm import tqdm
 
+from cacp.cache import TaskCache, fold_digest, store_task, load_task
+from cacp.curve import CurveRecording, CurveRecorder, PrequentialCurves, remove_curve
 from cacp.dataset import ClassificationDatasetBase, ClassificationFoldData, AVAILABLE_N_FOLDS, \
-    ClassificationFoldDataModifierBase, ClassificationFoldDataNormalizer
-from cacp.util import accuracy, precision, recall, auc, f1
+    ClassificationFoldDataModifierBase, ClassificationFoldDataNormalizer, ClassificationDatasetMinimalBase, \
+    dataset_profile
+from cacp.journal import ResultJournal
+from cacp.limit import run_with_limits, TaskStatus, limit_for, LIMIT
+from cacp.parallel import parallel_unordered, balance_workers, SharedFoldStore, DatasetHandle, prefetch
+from cacp.schedule import TaskCostEstimator, default_cost_history
+from cacp.telemetry import ResourceMonitor, TELEMETRY_COLUMNS, MODEL_SIZE, model_size_mb
+from cacp.util import accuracy, precision, recall, auc, f1, MetricContext
 
 DEFAULT_METRICS = (('AUC', auc), ('Accuracy', accuracy), ('Precision', precision), ('Recall', recall), ('F1', f1))
 
@@ -23,11 +34,82 @@ DEFAULT_INCREMENTAL_METRICS = (
 )
 
 
+PREDICTIONS_DIR = 'predictions'
+
+TASK_MEASUREMENT_COLUMNS = ('Train time [s]', 'Prediction time [s]') + TELEMETRY_COLUMNS
+
+COMPARISON_INFO_COLUMNS = (
+    'Dataset', 'Algorithm', 'Number of classes', 'Train size', 'Test size', 'CV index', 'Status', 'Threads'
+) + TASK_MEASUREMENT_COLUMNS
+
+
+def _fit_predict(model, fold: ClassificationFoldData, with_proba: bool = False,
+                 threads: typing.Optional[int] = None) -> typing.Tuple[
+    np.ndarray, typing.Optional[np.ndarray], typing.Optional[np.ndarray], typing.Dict[str, float]
+]:
+    with threadpool_limits(limits=threads), ResourceMonitor() as monitor:
+        train_start_time = timer()
+        if 'classes' in inspect.getfullargspec(model.fit).args:
+            model.fit(fold.x_train, fold.y_train, classes=fold.labels.tolist())
+        else:
+            model.fit(fold.x_train, fold.y_train)
+        train_time = timer() - train_start_time
+        pred_start_time = timer()
+        pred = model.predict(fold.x_test)
+        pred_time = timer() - pred_start_time
+    proba = None
+    if with_proba and hasattr(model, 'predict_proba'):
+        with threadpool_limits(limits=threads):
+            proba = model.predict_proba(fold.x_test)
+    measurements = {'Threads': threads, 'Train time [s]': train_time, 'Prediction time [s]': pred_time}
+    measurements.update(monitor.columns())
+    measurements[MODEL_SIZE] = model_size_mb(model)
+    return pred, proba, getattr(model, 'classes_', None), measurements
+
+
+def _predictions_path(predictions_dir: Path, dataset_name: str, classifier_name: str, cv_index: int) -> Path:
+    return predictions_dir.joinpath(dataset_name, f'{classifier_name}_{cv_index}.npz')
+
+
+def _save_predictions(path: Path, fold: ClassificationFoldData, pred: np.ndarray, proba: typing.Optional[np.ndarray],
+                      classes: typing.Optional[np.ndarray]):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    arrays = {'y_test': fold.y_test, 'y_pred': np.asarray(pred), 'labels': fold.labels}
+    if proba is not None:
+        arrays['proba'] = np.asarray(proba)
+        if classes is not None:
+            arrays['proba_classes'] = np.asarray(classes)
+    np.savez_compressed(path, **arrays)
+
+
+def _calculate_metrics(y_true: np.ndarray, pred: typing.Optional[np.ndarray], labels: np.ndarray,
+                       metrics: typing.Sequence[typing.Tuple[str, typing.Callable]], classifier_name: str) -> dict:
+    result = {}
+    # metrics that support it share single label encoding and confusion matrix
+    context = MetricContext(y_true, pred, labels) if pred is not None else None
+    for (metric, metric_fun) in metrics:
+        try:
+            from_context = getattr(metric_fun, 'from_context', None)
+            if context is not None and from_context is not None:
+                result[metric] = from_context(context)
+            else:
+                result[metric] = metric_fun(y_true, pred, labels)
+        except Exception as e:
+            result[metric] = 0.
+            print(f"Error while calculating {metric} for {classifier_name}, value will be set to 0", e)
+    return result
+
+
 def process_comparison_single(
     classifier_factory, classifier_name,
-    dataset: ClassificationDatasetBase,
+    dataset: typing.Union[ClassificationDatasetBase, DatasetHandle],
     fold: ClassificationFoldData,
     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+    time_limit: typing.Optional[float] = None,
+    memory_limit: typing.Optional[float] = None,
+    predictions_dir: typing.Optional[Path] = None,
+    cache_path: typing.Optional[Path] = None,
+    threads: typing.Optional[int] = None,
 ) -> dict:
     """
     Runs comparison on single classifier and dataset.
@@ -37,26 +119,43 @@ def process_comparison_single(
     :param dataset: single dataset
     :param fold: fold data
     :param metrics: metrics collection
+    :param time_limit: wall-clock time limit for training and prediction in seconds
+    :param memory_limit: memory limit for training and prediction in megabytes
+    :param predictions_dir: directory where test labels, predictions and class probabilities are stored,
+                            None disables storing
+    :param cache_path: task cache entry, task result is read from it if it exists or stored in it otherwise
+    :param threads: maximum number of native threads (BLAS, OpenMP) used by classifier, None for no limit
     :return: dictionary of calculated metrics and metadata
 
     """
-    model = classifier_factory(fold.x_train.shape[1], len(fold.labels))
-    train_start_time = timer()
     labels = fold.labels
     pred = None
-    try:
-        if 'classes' in inspect.getfullargspec(model.fit).args:
-            model.fit(fold.x_train, fold.y_train, classes=labels.tolist())
-        else:
-            model.fit(fold.x_train, fold.y_train)
-        train_time = timer() - train_start_time
-        pred_start_time = timer()
-        pred = model.predict(fold.x_test)
-        pred_time = timer() - pred_start_time
-    except Exception as e:
-        train_time = 9999
-        pred_time = 9999
-        print(f"Error while running {classifier_name}, metrics will be set to 0", e)
+    measurements = {'Threads': threads, **dict.fromkeys(TASK_MEASUREMENT_COLUMNS, np.nan)}
+    cached = None
+    if cache_path is not None and cache_path.exists():
+        try:
+            cached = load_task(cache_path)
+        except Exception as e:
+            print(f"Error while loading cached result of {classifier_name}, it will be computed again", e)
+    if cached is not None:
+        status = TaskStatus.OK
+        info, pred, proba, proba_classes = cached
+        measurements.update(info)
+    else:
+        model = classifier_factory(fold.x_train.shape[1], len(fold.labels))
+        status, value = run_with_limits(_fit_predict, (model, fold, predictions_dir is not None, threads),
+                                        time_limit, memory_limit)
+        if status == TaskStatus.OK:
+            pred, proba, proba_classes, measured = value
+            measurements.update(measured)
+            if cache_path is not None:
+                store_task(cache_path, measured, pred, proba, proba_classes)
+    if status == TaskStatus.OK:
+        if predictions_dir is not None:
+            _save_predictions(_predictions_path(predictions_dir, dataset.name, classifier_name, fold.index),
+                              fold, pred, proba, proba_classes)
+    else:
+        print(f"Error while running {classifier_name} ({status.value}), metrics will be set to 0", value)
 
     result = {
         'Dataset': dataset.name,
@@ -65,17 +164,14 @@ def process_comparison_single(
         'Train size': len(fold.x_train),
         'Test size': len(fold.x_test),
         'CV index': fold.index,
-        'Train time [s]': train_time,
-        'Prediction time [s]': pred_time
+        'Status': status.value,
+        **measurements
     }
 
-    for (metric, metric_fun) in metrics:
-        try:
-            result[metric] = metric_fun(fold.y_test, pred, labels)
-        except Exception as e:
-            result[metric] = 0.
-            print(f"Error while calculating {metric} for {classifier_name}, value will be set to 0", e)
-
+    if status == TaskStatus.OK:
+        result.update(_calculate_metrics(fold.y_test, pred, labels, metrics, classifier_name))
+    else:
+        result.update({metric: 0. for metric, _ in metrics})
     return result
 
 
@@ -90,6 +186,18 @@ def process_comparison(
     categorical_to_numerical=True,
     normalized: bool = False,
     progress=lambda progress, total: None,
+    n_jobs: typing.Optional[int] = None,
+    resume: bool = False,
+    prefetch_depth: int = 2,
+    time_limit: LIMIT = None,
+    memory_limit: LIMIT = None,
+    save_predictions: bool = False,
+    task_cache: typing.Optional[TaskCache] = None,
+    seed: typing.Optional[int] = None,
+    longest_first: bool = True,
+    cost_history: typing.Optional[typing.Sequence[Path]] = None,
+    threads_per_job: typing.Optional[int] = None,
+    folds: typing.Optional[typing.Collection[int]] = None,
 ):
     """
     Runs comparison for provided datasets and classifiers.
@@ -104,12 +212,25 @@ def process_comparison(
     :param categorical_to_numerical: if dataset categorical values should be converted to numerical
     :param normalized: if the data should be normalized in range [0..1]
     :param progress: function that can be used to monitor progress
+    :param n_jobs: number of parallel workers shared by all (dataset, fold, classifier) tasks, None uses all cores
+    :param resume: if tasks already stored in results journal should be skipped
+    :param prefetch_depth: number of folds loaded and modified in background ahead of running tasks
+    :param time_limit: wall-clock time limit of single task in seconds, for all or per classifier name
+    :param memory_limit: memory limit of single task in megabytes, for all or per classifier name
+    :param save_predictions: if test labels, predictions and class probabilities of every task should be stored,
+                             so metrics can be recomputed later without training classifiers again
+    :param task_cache: cache of tasks shared between experiments, tasks with the same classifier, fold data and seed
+                       are not computed again
+    :param seed: random seed of experiment, part of task cache keys
+    :param longest_first: if datasets and classifiers should be ordered by estimated cost, so the slowest tasks
+                          start first and do not delay the end of the run
+    :param cost_history: previous comparison.csv or time/comparison.csv files used to estimate tasks costs,
+                         None uses files of previous run in results directory
+    :param threads_per_job: number of native threads (BLAS, OpenMP) of each worker, None divides all cores between
+                            workers, when n_jobs is None it is derived from threads per job
+    :param folds: indexes of folds (CV index) that should be processed, None processes all folds
 
     """
-    count = 0
-    records = []
-    df = None
-
     fold_modifiers = []
 
     if custom_fold_modifiers:
@@ -118,130 +239,447 @@ def process_comparison(
     if normalized:
         fold_modifiers.append(ClassificationFoldDataNormalizer())
 
-    with tqdm(total=len(datasets) * n_folds, desc='Processing comparison', unit='fold') as pbar:
-        progress(pbar.n, pbar.total)
-        for dataset_idx, dataset in enumerate(datasets):
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    journal.open(comparison_settings(metrics, n_folds, custom_fold_modifiers, dob_scv, categorical_to_numerical,
+                                     normalized, seed), resume)
+    completed = journal.keys()
+    predictions_dir = result_dir.joinpath(PREDICTIONS_DIR) if save_predictions else None
+
+    dataset_names = [dataset.name for dataset in datasets]
+    classifier_names = [c_n for c_n, _ in classifiers]
+
+    # order of classifiers for each dataset
+    dataset_classifiers = {dataset.name: classifiers for dataset in datasets}
+    if longest_first:
+        estimator = TaskCostEstimator(default_cost_history(result_dir) if cost_history is None else cost_history)
+        if resume:
+            estimator.add(journal.to_frame())
+        costs = estimator.costs(datasets, classifier_names)
+        datasets = sorted(datasets, key=lambda d: -sum(costs[(d.name, c_n)] for c_n in classifier_names))
+        dataset_classifiers = {
+            d_n: sorted(classifiers, key=lambda c: -costs[(d_n, c[0])]) for d_n in dataset_names
+        }
+    n_tasks = len(datasets) * (n_folds if folds is None else len(folds)) * len(classifiers)
+    n_completed = len([
+        k for k in completed
+        if k[0] in dataset_names and k[1] in classifier_names and (folds is None or k[2] in folds)
+    ])
+
+    # number of unfinished tasks and shared files of each (dataset, fold)
+    shared_folds = {}
+
+    def prepared_folds(fold_store: SharedFoldStore):
+        for dataset in datasets:
             for fold in dataset.folds(n_folds=n_folds, dob_scv=dob_scv,
                                       categorical_to_numerical=categorical_to_numerical):
+                if folds is not None and fold.index not in folds:
+                    continue
+                pending_classifiers = [
+                    (c_n, c) for c_n, c in dataset_classifiers[dataset.name]
+                    if (dataset.name, c_n, fold.index) not in completed
+                ]
+                if not pending_classifiers:
+                    continue
 
                 modified_fold = fold
                 for fold_modifier in fold_modifiers:
                     modified_fold = fold_modifier.modify(modified_fold)
 
-                rows = Parallel(n_jobs=len(classifiers))(
-                    delayed(process_comparison_single)(c, c_n, dataset, modified_fold, metrics) for c_n, c in
-                    classifiers
-                )
-                records.extend(rows)
-                pbar.update(1)
-                progress(pbar.n, pbar.total)
+                fold_hash = fold_digest(modified_fold) if task_cache is not None else None
+                shared_fold, fold_dir = fold_store.share(modified_fold)
+                yield DatasetHandle(dataset.name), shared_fold, fold_hash, fold_dir, pending_classifiers
+
+    def tasks(fold_store: SharedFoldStore):
+        # folds of next datasets are loaded and modified in background while workers process current ones
+        for dataset_handle, shared_fold, fold_hash, fold_dir, pending_classifiers in prefetch(
+            prepared_folds(fold_store), prefetch_depth
+        ):
+            shared_folds[(dataset_handle.name, shared_fold.index)] = [len(pending_classifiers), fold_dir]
+            for c_n, c in pending_classifiers:
+                cache_path = None
+                if task_cache is not None:
+                    model = c(shared_fold.x_train.shape[1], len(shared_fold.labels))
+                    cache_path = task_cache.entry(task_cache.key(model, fold_hash, seed))
+                yield delayed(process_comparison_single)(c, c_n, dataset_handle, shared_fold, metrics,
+                                                         limit_for(time_limit, c_n), limit_for(memory_limit, c_n),
+                                                         predictions_dir, cache_path, threads)
+
+    n_workers, threads = balance_workers(n_jobs, threads_per_job, n_tasks - n_completed)
+    with tqdm(total=n_tasks, desc='Processing comparison', unit='task') as pbar, \
+            SharedFoldStore(enabled=n_workers > 1) as store:
+        pbar.update(n_completed)
+        progress(pbar.n, pbar.total)
+        for row in parallel_unordered(tasks(store), n_workers):
+            journal.append(row)
+            pbar.update(1)
+            progress(pbar.n, pbar.total)
 
-            df = pd.DataFrame(records)
-            df = df.sort_values(by=['Dataset', 'Algorithm', 'CV index'])
-            count += 1
-            df.to_csv(result_dir.joinpath(f'comparison_{count}.csv'), index=False)
-            if count > 1:
-                prev_file = result_dir.joinpath(f'comparison_{count - 1}.csv')
-                if os.path.isfile(prev_file):
-                    os.remove(prev_file)
+            shared_fold = shared_folds[(row['Dataset'], row['CV index'])]
+            shared_fold[0] -= 1
+            if shared_fold[0] == 0:
+                store.release(shared_fold[1])
 
-    if df is not None:
-        prev_file = result_dir.joinpath(f'comparison_{count}.csv')
-        if os.path.isfile(prev_file):
-            os.remove(prev_file)
-        df.to_csv(result_dir.joinpath('comparison.csv'), index=False)
+    if task_cache is not None:
+        task_cache.evict()
 
+    fold_indexes = range(1, n_folds + 1) if folds is None else folds
+    write_comparison(journal, result_dir, itertools.product(dataset_names, classifier_names, fold_indexes))
 
-def process_incremental_comparison_single(classifier_factory, classifier_name,
-                                          dataset: typing.Union[
-                                              ClassificationDatasetBase, Dataset
-                                          ], number_of_classes: int, incremental_comparison_dir: Path,
-                                          metrics: typing.Sequence[
-                                              typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS
-                                          ) -> dict:
+
+def comparison_settings(metrics: typing.Sequence[typing.Tuple[str, typing.Callable]], n_folds: int,
+                        custom_fold_modifiers: typing.Optional[typing.List[ClassificationFoldDataModifierBase]],
+                        dob_scv: bool, categorical_to_numerical: bool, normalized: bool,
+                        seed: typing.Optional[int]) -> dict:
     """
-    Runs comparison on single classifier and dataset.
+    Gets settings of comparison that change results of its tasks, stored with results journal.
 
-    :param classifier_factory: classifier factory
-    :param classifier_name: classifier name
-    :param dataset: single dataset
-    :param number_of_classes: number of classes
-    :param incremental_comparison_dir: incremental single results directory
     :param metrics: metrics collection
-    :return: dictionary of calculated metrics and metadata
+    :param n_folds: number of folds
+    :param custom_fold_modifiers: custom fold modifiers
+    :param dob_scv: if DOB-SCV folds are used
+    :param categorical_to_numerical: if dataset categorical values are converted to numerical
+    :param normalized: if the data is normalized
+    :param seed: random seed of experiment
+    :return: settings dictionary
+    """
+    return {
+        'metrics': [metric for metric, _ in metrics],
+        'n_folds': n_folds,
+        'fold_modifiers': [type(m).__name__ for m in custom_fold_modifiers or []],
+        'dob_scv': dob_scv,
+        'categorical_to_numerical': categorical_to_numerical,
+        'normalized': normalized,
+        'seed': seed,
+    }
 
+
+def write_comparison(journal: ResultJournal, result_dir: Path, keys: typing.Iterable[tuple]):
     """
+    Writes sorted comparison results of current experiment from results journal.
 
-    incremental_comparison_classifier_dir = incremental_comparison_dir.joinpath(classifier_name)
-    incremental_comparison_classifier_dir.mkdir(exist_ok=True, parents=True)
+    :param journal: results journal
+    :param result_dir: results directory
+    :param keys: keys of tasks of experiment (eg. dataset, classifier and fold), other journal rows are skipped
+
+    """
+    keys = set(keys)
+    df = pd.DataFrame.from_records(row for row in journal.rows() if journal.key(row) in keys)
+    if df.empty:
+        return
+    df = df.sort_values(by=list(journal.key_columns))
+    df.to_csv(result_dir.joinpath('comparison.csv'), index=False)
 
-    train_time = 0
-    pred_time = 0
 
-    train_size = 0
-    dataset_name = "-"
+def recompute_comparison(result_dir: Path,
+                         metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS):
+    """
+    Recomputes metrics of finished comparison from stored predictions and rewrites comparison results.
 
-    metric = river_metrics.base.Metrics([])
+    :param result_dir: results directory of comparison run with save_predictions enabled
+    :param metrics: metrics collection
 
-    try:
-        dataset_type = type(dataset)
-        if issubclass(dataset_type, ClassificationDatasetBase):
-            dataset_name = dataset.name
-            train_size = dataset.instances
-        elif issubclass(dataset_type, Dataset):
-            dataset_name = dataset.__class__.__name__.lower()
-            train_size = dataset.n_samples
+    """
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    dataset_names = list(df['Dataset'].unique())
+    classifier_names = list(df['Algorithm'].unique())
+    predictions_dir = result_dir.joinpath(PREDICTIONS_DIR)
+
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    rows = list(journal.rows()) or df.to_dict('records')
+    recomputed = []
+    for row in tqdm(rows, desc='Recomputing metrics', unit='task'):
+        result = {c: v for c, v in row.items() if c in COMPARISON_INFO_COLUMNS}
+        pred = y_test = labels = None
+        if row.get('Status', TaskStatus.OK.value) == TaskStatus.OK.value:
+            path = _predictions_path(predictions_dir, row['Dataset'], row['Algorithm'], row['CV index'])
+            if not path.exists():
+                raise FileNotFoundError(f'Predictions not found: {path}, comparison has to be run with '
+                                        f'save_predictions enabled')
+            with np.load(path, allow_pickle=True) as stored:
+                y_test, pred, labels = stored['y_test'], stored['y_pred'], stored['labels']
+        result.update(_calculate_metrics(y_test, pred, labels, metrics, row['Algorithm']))
+        recomputed.append(result)
+
+    journal.rewrite(recomputed)
+    write_comparison(journal, result_dir, dataset_names, classifier_names, ['Dataset', 'Algorithm', 'CV index'])
+
+
+def _incremental_dataset_name(dataset: typing.Union[ClassificationDatasetBase, Dataset]) -> str:
+    if isinstance(dataset, ClassificationDatasetBase):
+        return dataset.name
+    elif isinstance(dataset, Dataset):
+        return dataset.__class__.__name__.lower()
+    return "-"
+
+
+def _incremental_samples(dataset: typing.Union[ClassificationDatasetBase, Dataset]) -> typing.Iterable:
+    # cacp datasets stream samples materialized once, so they are not parsed and copied again for every classifier
+    return dataset.stream() if isinstance(dataset, ClassificationDatasetMinimalBase) else dataset
+
+
+def _incremental_batches(dataset: typing.Union[ClassificationDatasetBase, Dataset],
+                         batch_size: int) -> typing.Iterator[typing.Tuple[int, pd.DataFrame, pd.Series]]:
+    if isinstance(dataset, ClassificationDatasetMinimalBase):
+        yield from dataset.stream().batches(batch_size)
+        return
+
+    start = 0
+    batch_x = []
+    batch_y = []
+    for x, y in dataset:
+        batch_x.append(x)
+        batch_y.append(y)
+        if len(batch_y) == batch_size:
+            yield start, pd.DataFrame.from_records(batch_x), pd.Series(batch_y)
+            start += len(batch_y)
+            batch_x = []
+            batch_y = []
+    if batch_y:
+        yield start, pd.DataFrame.from_records(batch_x), pd.Series(batch_y)
+
+
+class _IncrementalEvaluation:
+    """
+    Test-then-train evaluation of single incremental classifier, samples are fed by caller.
+    """
 
-        metric = river_metrics.base.Metrics([m() for _, m in metrics])
-        model = classifier_factory(train_size, number_of_classes)
+    def __init__(self, classifier_factory, train_size: int, number_of_classes: int,
+                 metrics: typing.Sequence[typing.Tuple[str, typing.Callable]], recorder: CurveRecorder):
+        self.metrics = metrics
+        self.metric = river_metrics.base.Metrics([m() for _, m in metrics])
+        self.model = classifier_factory(train_size, number_of_classes)
+        self.train_time = 0
+        self.pred_time = 0
+        self.recorder = recorder
+        # metrics based on confusion matrix are calculated for whole chunks of samples, others by river
+        self.curves = PrequentialCurves(self.metric.data)
+        self._river_metrics = [m for idx, m in enumerate(self.metric.data) if idx not in self.curves.vectorized]
+        self._indexes = []
+        self._y_true = []
+        self._y_pred = []
+        # positions of recorded samples in chunk and values of river metrics after them
+        self._recorded = []
 
         # Determine if predict_one or predict_proba_one should be used in case of a classifier
-        if utils.inspect.isclassifier(model) and not metric.requires_labels:
-            pred_func = model.predict_proba_one
+        if utils.inspect.isclassifier(self.model) and not self.metric.requires_labels:
+            self.pred_func = self.model.predict_proba_one
+            self.pred_many_func = getattr(self.model, 'predict_proba_many', None)
         else:
-            pred_func = model.predict_one
+            self.pred_func = self.model.predict_one
+            self.pred_many_func = getattr(self.model, 'predict_many', None)
+        self.batched = self.pred_many_func is not None and hasattr(self.model, 'learn_many')
+        self.classes = set()
 
-        records = []
-        y_pred = None
+    def step(self, i: int, x: dict, y):
+        pred_start_time = timer()
+        # predict
+        y_pred = self.pred_func(x=x)
+        self.pred_time += timer() - pred_start_time
+
+        self._update(i, y, y_pred)
+
+        learn_one_start_time = timer()
+        # learn
+        self.model.learn_one(x=x, y=y)
+        self.train_time += timer() - learn_one_start_time
+
+    def step_many(self, start: int, x: pd.DataFrame, y: pd.Series,
+                  records: typing.Optional[typing.List[dict]] = None):
+        """
+        Tests and then trains classifier on batch of samples, whole batch is predicted before classifier learns it.
+        Classifiers without learn_many and predict_many methods are evaluated sample by sample.
+
+        :param start: index of first sample of batch
+        :param x: batch features
+        :param y: batch labels
+        :param records: batch features as list of samples dictionaries, created from x if not provided
+        """
+        if not self.batched:
+            for i, (x_one, y_one) in enumerate(zip(records or x.to_dict('records'), y), start=start):
+                self.step(i, x_one, y_one)
+            return
 
-        for i, x, y, *kwargs in stream.simulate_qa(dataset, None, None, copy=True):
+        pred_start_time = timer()
+        # predict
+        y_pred = self.pred_many_func(x)
+        self.pred_time += timer() - pred_start_time
+
+        if isinstance(y_pred, pd.DataFrame):
+            # some river classifiers name probabilities columns by string representation of class
+            classes = {str(c): c for c in self.classes}
+            columns = [c if c in self.classes else classes.get(str(c), c) for c in y_pred.columns]
+            y_pred = [
+                {c: p for c, p in zip(columns, row) if not pd.isna(p)} for row in y_pred.to_numpy().tolist()
+            ]
+        for i, (y_one, y_pred_one) in enumerate(zip(y, y_pred), start=start):
+            self._update(i, y_one, y_pred_one)
+
+        learn_many_start_time = timer()
+        # learn
+        self.model.learn_many(x, y)
+        self.train_time += timer() - learn_many_start_time
+        self.classes.update(y.unique().tolist())
+
+    def _update(self, i: int, y, y_pred):
+        # update the metrics
+        if y_pred != {} and y_pred is not None:
+            label = max(y_pred, key=y_pred.get) if type(y_pred) is dict else y_pred
+            for m in self._river_metrics:
+                # metrics that require labels get the most probable class, the same as in river Metrics
+                m.update(y, label if m.requires_labels else y_pred)
+
+            # the last sample stays in chunk, so it can be recorded when evaluation finishes
+            if len(self._y_true) >= self.recorder.chunk_size:
+                self._flush()
+            self._indexes.append(i)
+            self._y_true.append(y)
+            self._y_pred.append(label)
+            if self.recorder.wants(i):
+                self._recorded.append((len(self._y_true) - 1, [m.get() for m in self._river_metrics]))
+
+    def _flush(self, last: bool = False):
+        curves = self.curves.update(self._y_true, self._y_pred)
+        last_position = len(self._y_true) - 1
+        if last and last_position >= 0 and (not self._recorded or self._recorded[-1][0] != last_position):
+            self._recorded.append((last_position, [m.get() for m in self._river_metrics]))
+
+        for position, river_values in self._recorded:
+            record = {
+                'index': self._indexes[position],
+                'y_true': self._y_true[position],
+                'y_pred': self._y_pred[position]
+            }
+            river_values = iter(river_values)
+            for metric_idx, (metric_name, _) in enumerate(self.metrics):
+                record[metric_name] = curves[metric_idx][position] if metric_idx in curves else next(river_values)
+            self.recorder.record(record)
+
+        self._indexes = []
+        self._y_true = []
+        self._y_pred = []
+        self._recorded = []
+
+    def finish(self) -> typing.Tuple[typing.List[typing.Any], float, float]:
+        self._flush(last=True)
+        self.recorder.close()
+
+        values = []
+        for metric_idx, m in enumerate(self.metric.data):
+            try:
+                values.append(float(self.curves.values[metric_idx] if metric_idx in self.curves.values else m.get()))
+            except Exception as e:
+                values.append(e)
+
+        return values, self.train_time, self.pred_time
+
+
+def _evaluate_incremental(classifier_factory, dataset: typing.Union[ClassificationDatasetBase, Dataset],
+                          train_size: int, number_of_classes: int,
+                          metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+                          result_path: Path, threads: typing.Optional[int] = None,
+                          batch_size: typing.Optional[int] = None,
+                          recording: typing.Optional[CurveRecording] = None) -> typing.Tuple[
+    typing.List[typing.Any], float, float
+]:
+    with threadpool_limits(limits=threads):
+        return _evaluate_incremental_stream(classifier_factory, dataset, train_size, number_of_classes, metrics,
+                                            result_path, batch_size, recording)
+
+
+def _evaluate_incremental_stream(classifier_factory, dataset: typing.Union[ClassificationDatasetBase, Dataset],
+                                 train_size: int, number_of_classes: int,
+                                 metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+                                 result_path: Path,
+                                 batch_size: typing.Optional[int] = None,
+                                 recording: typing.Optional[CurveRecording] = None
+                                 ) -> typing.Tuple[typing.List[typing.Any], float, float]:
+    recorder = (recording or CurveRecording()).recorder(result_path, train_size)
+    evaluation = _IncrementalEvaluation(classifier_factory, train_size, number_of_classes, metrics, recorder)
+    try:
+        if batch_size and evaluation.batched:
+            for start, x, y in _incremental_batches(dataset, batch_size):
+                evaluation.step_many(start, x, y)
+        else:
+            for i, (x, y) in enumerate(_incremental_samples(dataset)):
+                evaluation.step(i, x, y)
+    except Exception:
+        recorder.discard()
+        raise
+    return evaluation.finish()
+
+
+def _evaluate_incremental_group(classifiers: typing.List[typing.Tuple[str, typing.Callable]],
+                                dataset: typing.Union[ClassificationDatasetBase, Dataset],
+                                train_size: int, number_of_classes: int,
+                                metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+                                result_paths: typing.Dict[str, Path], threads: typing.Optional[int] = None,
+                                batch_size: typing.Optional[int] = None,
+                                recording: typing.Optional[CurveRecording] = None
+                                ) -> typing.Dict[str, typing.Tuple[TaskStatus, typing.Any]]:
+    recording = recording or CurveRecording()
+    results = {}
+    evaluations = {}
+    with threadpool_limits(limits=threads):
+        for c_n, c in classifiers:
+            try:
+                recorder = recording.recorder(result_paths[c_n], train_size)
+                evaluations[c_n] = _IncrementalEvaluation(c, train_size, number_of_classes, metrics, recorder)
+            except Exception as e:
+                results[c_n] = (TaskStatus.ERROR, repr(e))
+
+        # every sample is fed to all classifiers in lockstep, classifier that fails is dropped, others continue
+        if batch_size and any(evaluation.batched for evaluation in evaluations.values()):
+            for start, x, y in _incremental_batches(dataset, batch_size):
+                # samples dictionaries are created once for all classifiers without batch methods
+                records = None if all(e.batched for e in evaluations.values()) else x.to_dict('records')
+                for c_n, evaluation in list(evaluations.items()):
+                    try:
+                        evaluation.step_many(start, x, y, records)
+                    except Exception as e:
+                        results[c_n] = (TaskStatus.ERROR, repr(e))
+                        evaluations.pop(c_n).recorder.discard()
+        else:
+            for i, (x, y) in enumerate(_incremental_samples(dataset)):
+                for c_n, evaluation in list(evaluations.items()):
+                    try:
+                        evaluation.step(i, x, y)
+                    except Exception as e:
+                        results[c_n] = (TaskStatus.ERROR, repr(e))
+                        evaluations.pop(c_n).recorder.discard()
 
-            kwargs = kwargs[0] if kwargs else {}
+        for c_n, evaluation in evaluations.items():
+            results[c_n] = (TaskStatus.OK, evaluation.finish())
+    return results
 
-            if y is None:
-                # no ground truth, just make a prediction
-                pred_start_time = timer()
-                # predict
-                y_pred = pred_func(x=x, **kwargs)
-                pred_time_diff = timer() - pred_start_time
-                pred_time += pred_time_diff
-            else:
-                # there's a ground truth, model and metric can be updated
-
-                # update the metrics
-                if y_pred != {} and y_pred is not None:
-                    metric.update(y_true=y, y_pred=y_pred)
-                    y_pred = max(y_pred, key=y_pred.get) if type(y_pred) is dict else y_pred
-                    record = {
-                        'index': i,
-                        'y_true': y,
-                        'y_pred': y_pred
-                    }
-                    for metric_idx, (metric_name, _) in enumerate(metrics):
-                        record[metric_name] = metric.data[metric_idx].get()
-                    records.append(record)
-
-                learn_one_start_time = timer()
-                # learn
-                model.learn_one(x=x, y=y, **kwargs)
-                learn_time_diff = timer() - learn_one_start_time
-                train_time += learn_time_diff
-
-        df = pd.DataFrame(records)
-        df.to_csv(incremental_comparison_classifier_dir.joinpath(f'{dataset_name}.csv'), index=False)
-
-    except Exception as e:
-        print(f"Error while running {classifier_name}, metrics will be set to 0", e)
+
+def _incremental_train_size(dataset: typing.Union[ClassificationDatasetBase, Dataset]) -> int:
+    if isinstance(dataset, ClassificationDatasetBase):
+        return dataset.instances
+    elif isinstance(dataset, Dataset):
+        return dataset.n_samples
+    return 0
+
+
+def _incremental_result_path(incremental_comparison_dir: Path, classifier_name: str, dataset_name: str) -> Path:
+    incremental_comparison_classifier_dir = incremental_comparison_dir.joinpath(classifier_name)
+    incremental_comparison_classifier_dir.mkdir(exist_ok=True, parents=True)
+    # suffix is added by curve recorder according to curve format
+    return incremental_comparison_classifier_dir.joinpath(dataset_name)
+
+
+def _incremental_result(classifier_name: str, dataset_name: str, number_of_classes: int, train_size: int,
+                        status: TaskStatus, value: typing.Any,
+                        metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+                        threads: typing.Optional[int], result_path: Path) -> dict:
+    train_time = np.nan
+    pred_time = np.nan
+    values = [None for _ in metrics]
+    if status == TaskStatus.OK:
+        values, train_time, pred_time = value
+    else:
+        # killed evaluation (timeout, memory limit) can't clean its curve
+        remove_curve(result_path)
+        print(f"Error while running {classifier_name} ({status.value}), metrics will be set to 0", value)
 
     result = {
         'Dataset': dataset_name,
@@ -249,27 +687,137 @@ def process_incremental_comparison_single(classifier_factory, classifier_name,
         'Number of classes': number_of_classes,
         'Train size': train_size,
         'Test size': train_size,
+        'Status': status.value,
+        'Threads': threads,
         'Train time [s]': train_time,
         'Prediction time [s]': pred_time
     }
 
-    for metric_idx, (metric_name, _) in enumerate(metrics):
-        try:
-            value = metric.data[metric_idx].get()
-            result[metric_name] = float(value)
-        except Exception as e:
-            print(f"Error while calculating {metric} for {classifier_name}, value will be set to 0", e)
+    for (metric_name, _), metric_value in zip(metrics, values):
+        if isinstance(metric_value, float):
+            result[metric_name] = metric_value
+        elif status != TaskStatus.OK:
+            result[metric_name] = 0.
+        else:
+            print(f"Error while calculating {metric_name} for {classifier_name}, value will be set to 0", metric_value)
             result[metric_name] = 0.
 
     return result
 
 
+def process_incremental_comparison_single(classifier_factory, classifier_name,
+                                          dataset: typing.Union[
+                                              ClassificationDatasetBase, Dataset
+                                          ], number_of_classes: int, incremental_comparison_dir: Path,
+                                          metrics: typing.Sequence[
+                                              typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS,
+                                          time_limit: typing.Optional[float] = None,
+                                          memory_limit: typing.Optional[float] = None,
+                                          threads: typing.Optional[int] = None,
+                                          batch_size: typing.Optional[int] = None,
+                                          recording: typing.Optional[CurveRecording] = None,
+                                          ) -> dict:
+    """
+    Runs comparison on single classifier and dataset.
+
+    :param classifier_factory: classifier factory
+    :param classifier_name: classifier name
+    :param dataset: single dataset
+    :param number_of_classes: number of classes
+    :param incremental_comparison_dir: incremental single results directory
+    :param metrics: metrics collection
+    :param time_limit: wall-clock time limit for processing whole dataset in seconds
+    :param memory_limit: memory limit for processing whole dataset in megabytes
+    :param threads: maximum number of native threads (BLAS, OpenMP) used by classifier, None for no limit
+    :param batch_size: number of samples predicted and then learned at once by classifiers with learn_many and
+                       predict_many methods, None evaluates sample by sample
+    :param recording: learning curve recording settings, None records every sample in csv file
+    :return: dictionary of calculated metrics and metadata
+
+    """
+    dataset_name = _incremental_dataset_name(dataset)
+    train_size = _incremental_train_size(dataset)
+    result_path = _incremental_result_path(incremental_comparison_dir, classifier_name, dataset_name)
+    status, value = run_with_limits(
+        _evaluate_incremental,
+        (classifier_factory, dataset, train_size, number_of_classes, metrics, result_path, threads, batch_size,
+         recording),
+        time_limit, memory_limit
+    )
+    return _incremental_result(classifier_name, dataset_name, number_of_classes, train_size, status, value, metrics,
+                               threads, result_path)
+
+
+def process_incremental_comparison_group(classifiers: typing.List[typing.Tuple[str, typing.Callable]],
+                                         dataset: typing.Union[ClassificationDatasetBase, Dataset],
+                                         number_of_classes: int, incremental_comparison_dir: Path,
+                                         metrics: typing.Sequence[
+                                             typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS,
+                                         time_limit: typing.Optional[float] = None,
+                                         memory_limit: typing.Optional[float] = None,
+                                         threads: typing.Optional[int] = None,
+                                         batch_size: typing.Optional[int] = None,
+                                         recording: typing.Optional[CurveRecording] = None,
+                                         ) -> typing.List[dict]:
+    """
+    Runs comparison on group of classifiers and single dataset, dataset is streamed once and every sample is used
+    to test and then train all classifiers of group. Classifiers receive the same sample dictionary,
+    so they should not modify it.
+
+    :param classifiers: classifiers collection
+    :param dataset: single dataset
+    :param number_of_classes: number of classes
+    :param incremental_comparison_dir: incremental single results directory
+    :param metrics: metrics collection
+    :param time_limit: wall-clock time limit for processing whole dataset by whole group in seconds,
+                       if it is exceeded all classifiers of group are reported with TIMEOUT status
+    :param memory_limit: memory limit for processing whole dataset by whole group in megabytes,
+                         if it is exceeded all classifiers of group are reported with OOM status
+    :param threads: maximum number of native threads (BLAS, OpenMP) used by classifiers, None for no limit
+    :param batch_size: number of samples predicted and then learned at once by classifiers with learn_many and
+                       predict_many methods, None evaluates sample by sample
+    :param recording: learning curve recording settings, None records every sample in csv file
+    :return: list of dictionaries of calculated metrics and metadata
+
+    """
+    dataset_name = _incremental_dataset_name(dataset)
+    train_size = _incremental_train_size(dataset)
+    result_paths = {
+        c_n: _incremental_result_path(incremental_comparison_dir, c_n, dataset_name) for c_n, _ in classifiers
+    }
+    status, value = run_with_limits(
+        _evaluate_incremental_group,
+        (classifiers, dataset, train_size, number_of_classes, metrics, result_paths, threads, batch_size, recording),
+        time_limit, memory_limit
+    )
+    rows = []
+    for c_n, _ in classifiers:
+        c_status, c_value = value[c_n] if status == TaskStatus.OK else (status, value)
+        rows.append(_incremental_result(c_n, dataset_name, number_of_classes, train_size, c_status, c_value, metrics,
+                                        threads, result_paths[c_n]))
+    return rows
+
+
+def _group_limit(limit: LIMIT, classifier_names: typing.List[str]) -> typing.Optional[float]:
+    # classifiers of group run one after another on every sample, so group limit is sum of their limits
+    limits = [limit_for(limit, c_n) for c_n in classifier_names]
+    return None if any(v is None for v in limits) else sum(limits)
+
+
 def process_incremental_comparison(
     datasets: typing.List[typing.Union[ClassificationDatasetBase, river.datasets.base.Dataset]],
     classifiers: typing.List[typing.Tuple[str, typing.Callable]],
     result_dir: Path,
     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS,
     progress=lambda progress, total: None,
+    resume: bool = False,
+    time_limit: LIMIT = None,
+    memory_limit: LIMIT = None,
+    n_jobs: typing.Optional[int] = None,
+    threads_per_job: typing.Optional[int] = None,
+    shared_stream: bool = False,
+    batch_size: typing.Optional[int] = None,
+    recording: typing.Optional[CurveRecording] = None,
 ):
     """
     Runs comparison for provided datasets and incremental classifiers.
@@ -279,46 +827,83 @@ def process_incremental_comparison(
     :param result_dir: results directory
     :param metrics: metrics collection
     :param progress: function that can be used to monitor progress
+    :param resume: if tasks already stored in results journal should be skipped
+    :param time_limit: wall-clock time limit of single classifier on single dataset in seconds,
+                       for all or per classifier name
+    :param memory_limit: memory limit of single classifier on single dataset in megabytes,
+                         for all or per classifier name
+    :param n_jobs: number of classifiers processed in parallel on each dataset, None uses all cores
+    :param threads_per_job: number of native threads (BLAS, OpenMP) of each worker, None divides all cores between
+                            workers, when n_jobs is None it is derived from threads per job
+    :param shared_stream: if classifiers should be split into one group per worker and each group should stream
+                          dataset once, feeding every sample to all its classifiers, limits of group are sums of
+                          limits of its classifiers
+    :param batch_size: number of samples predicted and then learned at once by classifiers with learn_many and
+                       predict_many methods, None evaluates sample by sample
+    :param recording: learning curve recording settings, None records every sample in csv file
 
     """
 
     incremental_comparison_dir = result_dir.joinpath('incremental').joinpath('result')
     incremental_comparison_dir.mkdir(exist_ok=True, parents=True)
-    count = 0
-    records = []
-    df = None
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm'])
+    journal.open({
+        'metrics': [metric for metric, _ in metrics],
+        'batch_size': batch_size,
+        'recording': dataclasses.asdict(recording or CurveRecording()),
+    }, resume)
+    completed = journal.keys()
 
     with tqdm(total=len(datasets), desc='Processing comparison', unit='dataset') as pbar:
         progress(pbar.n, pbar.total)
         for dataset_idx, dataset in enumerate(datasets):
-
-            # preload dataset to prevent race conditions on file savings and count classes
-            labels = set()
-            for x, y in dataset:
-                labels.add(y)
-            number_of_classes = len(labels)
-
-            rows = Parallel(n_jobs=len(classifiers))(
-                delayed(process_incremental_comparison_single)(c, c_n, dataset, number_of_classes,
-                                                               incremental_comparison_dir, metrics) for
-                c_n, c in
-                classifiers
-            )
-            records.extend(rows)
+            dataset_name = _incremental_dataset_name(dataset)
+            pending_classifiers = [(c_n, c) for c_n, c in classifiers if (dataset_name, c_n) not in completed]
+            if not pending_classifiers:
+                pbar.update(1)
+                progress(pbar.n, pbar.total)
+                continue
+
+            # profile and stream preload dataset, so workers do not race on file savings and share samples order
+            number_of_classes = dataset_profile(dataset).classes
+            if isinstance(dataset, ClassificationDatasetMinimalBase):
+                dataset.stream()
+
+            n_workers, threads = balance_workers(n_jobs, threads_per_job, len(pending_classifiers))
+            if shared_stream:
+                groups = [pending_classifiers[i::n_workers] for i in range(n_workers)]
+                group_rows = parallel_unordered(
+                    (delayed(process_incremental_comparison_group)(group, dataset, number_of_classes,
+                                                                   incremental_comparison_dir, metrics,
+                                                                   _group_limit(time_limit, [c_n for c_n, _ in group]),
+                                                                   _group_limit(memory_limit,
+                                                                                [c_n for c_n, _ in group]),
+                                                                   threads, batch_size, recording) for
+                     group in groups),
+                    n_workers
+                )
+                rows = (row for group_row in group_rows for row in group_row)
+            else:
+                rows = parallel_unordered(
+                    (delayed(process_incremental_comparison_single)(c, c_n, dataset, number_of_classes,
+                                                                    incremental_comparison_dir, metrics,
+                                                                    limit_for(time_limit, c_n),
+                                                                    limit_for(memory_limit, c_n),
+                                                                    threads, batch_size, recording) for
+                     c_n, c in
+                     pending_classifiers),
+                    n_workers
+                )
+            try:
+                for row in rows:
+                    journal.append(row)
+            finally:
+                if isinstance(dataset, ClassificationDatasetMinimalBase):
+                    dataset.release_stream()
             pbar.update(1)
             progress(pbar.n, pbar.total)
 
-            df = pd.DataFrame(records)
-            df = df.sort_values(by=['Dataset', 'Algorithm'])
-            count += 1
-            df.to_csv(result_dir.joinpath(f'comparison_{count}.csv'), index=False)
-            if count > 1:
-                prev_file = result_dir.joinpath(f'comparison_{count - 1}.csv')
-                if os.path.isfile(prev_file):
-                    os.remove(prev_file)
-
-    if df is not None:
-        prev_file = result_dir.joinpath(f'comparison_{count}.csv')
-        if os.path.isfile(prev_file):
-            os.remove(prev_file)
-        df.to_csv(result_dir.joinpath('comparison.csv'), index=False)
+    write_comparison(
+        journal, result_dir,
+        itertools.product([_incremental_dataset_name(dataset) for dataset in datasets], [c_n for c_n, _ in classifiers])
+    )
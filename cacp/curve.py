@@ -0,0 +1,373 @@
+import dataclasses
+import gzip
+import operator
+import os
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import typing_extensions
+from river import metrics as river_metrics
+
+CURVE_FORMATS = typing_extensions.Literal['csv', 'csv.gz', 'npz']
+
+CURVE_SUFFIXES = ('.csv', '.csv.gz', '.npz')
+
+# river metrics calculated from confusion matrix counts that have vectorized equivalent
+_VECTORIZED_METRICS = (
+    river_metrics.Accuracy, river_metrics.Precision, river_metrics.Recall, river_metrics.F1, river_metrics.FBeta
+)
+
+
+@dataclasses.dataclass
+class CurveRecording:
+    """
+    Settings of incremental learning curves recording, every sample is used to update metrics, but only some
+    of them are recorded in curve. The last sample is always recorded.
+
+    :param interval: every interval-th sample is recorded
+    :param log_points: number of log-spaced checkpoints recorded instead of every interval-th sample,
+                       used only if stream length is known
+    :param format: curve file format, csv, compressed csv.gz or compressed binary npz
+    :param chunk_size: number of recorded samples kept in memory before they are written to file
+    """
+
+    interval: int = 1
+    log_points: typing.Optional[int] = None
+    format: CURVE_FORMATS = 'csv'
+    chunk_size: int = 10000
+
+    def checkpoints(self, n_samples: int) -> typing.Optional[typing.Set[int]]:
+        """
+        Calculates log-spaced checkpoints.
+
+        :param n_samples: stream length
+        :return: indexes of recorded samples or None if samples are recorded in interval
+        """
+        if not self.log_points or n_samples <= 0:
+            return None
+        return set((np.unique(np.geomspace(1, n_samples, num=self.log_points).astype(int)) - 1).tolist())
+
+    def recorder(self, path: Path, n_samples: int = 0) -> 'CurveRecorder':
+        """
+        Creates recorder of single curve.
+
+        :param path: curve file path without suffix
+        :param n_samples: stream length, 0 if unknown
+        :return: curve recorder
+        """
+        return CurveRecorder(path.with_name(f'{path.name}.{self.format}'), self.format, self.interval,
+                             self.checkpoints(n_samples), self.chunk_size)
+
+
+class CurveRecorder:
+    """
+    Writes learning curve in chunks, so memory does not grow with stream length.
+    """
+
+    def __init__(self, path: Path, curve_format: CURVE_FORMATS = 'csv', interval: int = 1,
+                 checkpoints: typing.Optional[typing.Set[int]] = None, chunk_size: int = 10000):
+        """
+        Initializes curve recorder.
+
+        :param path: curve file path
+        :param curve_format: curve file format
+        :param interval: every interval-th sample is recorded
+        :param checkpoints: indexes of recorded samples, used instead of interval
+        :param chunk_size: number of recorded samples kept in memory before they are written to file
+        """
+        self.path = path
+        # curve is written to temporary file and moved to its path when it is complete, so curve of killed
+        # evaluation is never left in results
+        self.tmp_path = _tmp_curve_path(path)
+        self.format = curve_format
+        self.interval = max(interval, 1)
+        self.checkpoints = checkpoints
+        self.chunk_size = chunk_size
+        self._rows = []
+        self._columns = None
+        self._file = None
+        self._arrays = []
+
+    def wants(self, index: int) -> bool:
+        """
+        Checks if sample should be recorded.
+
+        :param index: sample index
+        :return: True if sample should be recorded
+        """
+        if self.checkpoints is not None:
+            return index in self.checkpoints
+        return index % self.interval == 0
+
+    def record(self, row: dict):
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_size:
+            self._flush()
+
+    def close(self):
+        """
+        Writes remaining recorded samples, closes curve file and moves it to curve path, curve file is not created
+        (and curve of previous run is removed) if nothing was recorded.
+        """
+        self._flush()
+        if self.format == 'npz':
+            if self._columns:
+                arrays = {}
+                for column in self._columns:
+                    arrays[column] = np.concatenate([chunk[column] for chunk in self._arrays])
+                with self.tmp_path.open('wb') as f:
+                    np.savez_compressed(f, **arrays)
+            self._arrays = []
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.tmp_path.exists():
+            os.replace(self.tmp_path, self.path)
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def discard(self):
+        """
+        Drops recorded samples and removes partially written curve file and curve of previous run,
+        used when evaluation fails.
+        """
+        self._rows = []
+        self._arrays = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.tmp_path.unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+    def _open(self) -> typing.TextIO:
+        if self._file is None:
+            self._file = gzip.open(self.tmp_path, 'wt', newline='') if self.format == 'csv.gz' else \
+                self.tmp_path.open('w', newline='')
+        return self._file
+
+    def _flush(self):
+        if not self._rows:
+            return
+        df = pd.DataFrame(self._rows)
+        self._rows = []
+        if self.format == 'npz':
+            self._columns = self._columns or list(df.columns)
+            self._arrays.append({c: df[c].to_numpy() for c in self._columns})
+        else:
+            header = self._file is None
+            df.to_csv(self._open(), index=False, header=header)
+
+
+class PrequentialCurves:
+    """
+    Calculates running values of river metrics based on confusion matrix counts (accuracy, precision, recall and
+    F-beta) for whole chunks of true and predicted labels at once using cumulative counts. Values are the same as
+    values returned by river metrics updated sample by sample.
+    """
+
+    def __init__(self, metrics: typing.Sequence[river_metrics.base.Metric]):
+        """
+        Initializes prequential curves.
+
+        :param metrics: river metrics, only metrics with vectorized equivalent are calculated
+        """
+        self.vectorized = {idx: m for idx, m in enumerate(metrics) if type(m) in _VECTORIZED_METRICS}
+        self.values = {idx: 0.0 for idx in self.vectorized}
+        self._n = 0
+        self._correct = 0
+        # true positives, false positives and false negatives of binary metrics
+        self._counts = {idx: np.zeros(3) for idx, m in self.vectorized.items() if hasattr(m, 'pos_val')}
+
+    def update(self, y_true: typing.Sequence, y_pred: typing.Sequence) -> typing.Dict[int, typing.List[float]]:
+        """
+        Adds chunk of samples.
+
+        :param y_true: true labels
+        :param y_pred: predicted labels
+        :return: running values of vectorized metrics after every sample of chunk
+        """
+        n = len(y_true)
+        if n == 0:
+            return {idx: [] for idx in self.vectorized}
+
+        # python equality is used, so labels are compared the same way as in river confusion matrix
+        correct = np.cumsum(np.fromiter(map(operator.eq, y_true, y_pred), dtype=bool, count=n)) + self._correct
+        total = np.arange(self._n + 1, self._n + n + 1, dtype=float)
+        self._n += n
+        self._correct = correct[-1]
+
+        positives = {}
+        curves = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for idx, m in self.vectorized.items():
+                if not hasattr(m, 'pos_val'):
+                    values = correct / total
+                else:
+                    if m.pos_val not in positives:
+                        positives[m.pos_val] = (
+                            np.fromiter((v == m.pos_val for v in y_true), dtype=bool, count=n),
+                            np.fromiter((v == m.pos_val for v in y_pred), dtype=bool, count=n),
+                        )
+                    true_pos, pred_pos = positives[m.pos_val]
+                    tp = np.cumsum(true_pos & pred_pos) + self._counts[idx][0]
+                    fp = np.cumsum(~true_pos & pred_pos) + self._counts[idx][1]
+                    fn = np.cumsum(true_pos & ~pred_pos) + self._counts[idx][2]
+                    self._counts[idx] = np.array([tp[-1], fp[-1], fn[-1]])
+
+                    precision = np.where(tp + fp > 0, tp / (tp + fp), 0.)
+                    recall = np.where(tp + fn > 0, tp / (tp + fn), 0.)
+                    if isinstance(m, river_metrics.Precision):
+                        values = precision
+                    elif isinstance(m, river_metrics.Recall):
+                        values = recall
+                    else:
+                        b2 = m.beta ** 2
+                        denominator = b2 * precision + recall
+                        values = np.where(denominator != 0, (1 + b2) * precision * recall / denominator, 0.)
+                curves[idx] = values.tolist()
+                self.values[idx] = curves[idx][-1]
+        return curves
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_points: int) -> np.ndarray:
+    """
+    Selects points of series with largest-triangle-three-buckets algorithm, which preserves visual shape of series
+    (peaks and drops) with much fewer points.
+
+    :param x: series x values (increasing)
+    :param y: series y values
+    :param n_points: target number of points
+    :return: indexes of selected points, all points if series is not longer than target
+    """
+    n = len(x)
+    if n <= n_points or n_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    # first and last point are always selected, other points are split into n_points - 2 buckets
+    edges = np.linspace(1, n - 1, n_points - 1).astype(int)
+    edges = np.append(edges, n)
+    indexes = np.empty(n_points, dtype=int)
+    indexes[0], indexes[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(n_points - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[selected] - next_x) * (y[start:end] - y[selected]) -
+                       (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        indexes[bucket + 1] = selected
+    return indexes
+
+
+def downsample_curve(df: pd.DataFrame, columns: typing.Sequence[str],
+                     n_points: typing.Optional[int]) -> typing.Dict[str, pd.DataFrame]:
+    """
+    Downsamples curve columns separately, so shape of every metric curve is preserved.
+
+    :param df: curve data frame
+    :param columns: downsampled metric columns
+    :param n_points: target number of points of every column, None keeps all points
+    :return: data frames with index and single metric column for every column
+    """
+    downsampled = {}
+    for column in columns:
+        indexes = np.arange(len(df)) if n_points is None else lttb(df['index'].values, df[column].values, n_points)
+        downsampled[column] = pd.DataFrame({'index': df['index'].values[indexes], column: df[column].values[indexes]})
+    return downsampled
+
+
+def read_downsampled_curve(path: Path, cache_path: Path, columns: typing.Sequence[str],
+                           n_points: typing.Optional[int]) -> typing.Dict[str, pd.DataFrame]:
+    """
+    Reads downsampled curve from cache or downsamples curve file and caches result.
+    Cache is used if it is newer than curve file and was created with the same target number of points.
+
+    :param path: curve file path
+    :param cache_path: downsampled curve cache file path (npz)
+    :param columns: downsampled metric columns
+    :param n_points: target number of points of every column, None reads full curve without caching
+    :return: data frames with index and single metric column for every column
+    """
+    if n_points is None:
+        return downsample_curve(read_curve(path), columns, None)
+    try:
+        if cache_path.stat().st_mtime >= path.stat().st_mtime:
+            with np.load(cache_path, allow_pickle=True) as data:
+                if int(data['n_points']) == n_points and all(column in data.files for column in columns):
+                    return {
+                        column: pd.DataFrame({'index': data[f'{column}_index'], column: data[column]})
+                        for column in columns
+                    }
+    except OSError:
+        pass
+
+    df = read_curve(path)
+    downsampled = downsample_curve(df, [c for c in df.columns if c not in ('index', 'y_true', 'y_pred')], n_points)
+    arrays = {'n_points': n_points}
+    for column, column_df in downsampled.items():
+        arrays[f'{column}_index'] = column_df['index'].values
+        arrays[column] = column_df[column].values
+    cache_path.parent.mkdir(exist_ok=True, parents=True)
+    np.savez_compressed(cache_path, **arrays)
+    return {column: downsampled[column] for column in columns}
+
+
+def _tmp_curve_path(path: Path) -> Path:
+    return path.with_name(f'.{path.name}.tmp')
+
+
+def remove_curve(path: Path):
+    """
+    Removes curve files of every curve format (also partially written ones), used when evaluation fails
+    or is killed, so no curve of it (or of previous run) is left in results.
+
+    :param path: curve file path without suffix
+    """
+    for suffix in CURVE_SUFFIXES:
+        curve_path = path.with_name(f'{path.name}{suffix}')
+        curve_path.unlink(missing_ok=True)
+        _tmp_curve_path(curve_path).unlink(missing_ok=True)
+
+
+def _is_empty_curve(path: Path) -> bool:
+    if path.stat().st_size == 0:
+        return True
+    if path.name.endswith('.npz'):
+        with np.load(path, allow_pickle=True) as data:
+            return len(data.files) == 0
+    with (gzip.open(path, 'rt') if path.name.endswith('.gz') else path.open()) as f:
+        return f.readline().strip() == ''
+
+
+def curve_files(directory: Path) -> typing.Iterator[typing.Tuple[str, Path]]:
+    """
+    Finds curve files in directory, empty curves are skipped.
+
+    :param directory: directory with curves of single classifier
+    :return: iterator of dataset names and curve files paths
+    """
+    for path in sorted(directory.iterdir()):
+        for suffix in CURVE_SUFFIXES:
+            if path.name.endswith(suffix):
+                if not _is_empty_curve(path):
+                    yield path.name[:-len(suffix)], path
+                break
+
+
+def read_curve(path: Path) -> pd.DataFrame:
+    """
+    Reads curve file written in any of curve formats.
+
+    :param path: curve file path
+    :return: curve data frame, empty if curve is empty
+    """
+    if path.name.endswith('.npz'):
+        with np.load(path, allow_pickle=True) as data:
+            return pd.DataFrame({k: data[k] for k in data.files})
+    try:
+        return pd.read_csv(path)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
@@ -1,4 +1,10 @@
+import collections
 import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 import typing
 from abc import ABC, abstractmethod
 from pathlib import Path
@@ -29,6 +35,14 @@ AVAILABLE_CLASSIFICATION_DATASET_NAMES = typing_extensions.Literal[
 
 AVAILABLE_N_FOLDS = typing_extensions.Literal[5, 10]
 
+# increase when format of parsed folds cache changes
+FOLDS_CACHE_VERSION = 1
+
+FOLD_ARRAYS = ('x_train', 'y_train', 'x_test', 'y_test', 'labels')
+
+# increase when format of persisted dataset profile changes
+PROFILE_VERSION = 2
+
 
 @dataclasses.dataclass
 class ClassificationFoldData:
@@ -45,6 +59,132 @@ class ClassificationFoldData:
     y_test: np.ndarray = dataclasses.field(repr=False)
 
 
+@dataclasses.dataclass
+class DatasetProfile:
+    """
+    Class that represents summary of single dataset, class counts are keyed by labels as returned by dataset folds
+    and count is None when it is not known without parsing dataset.
+    """
+
+    instances: int
+    features: int
+    class_counts: typing.Dict[typing.Any, typing.Optional[int]]
+    dtypes: typing.List[str]
+
+    @property
+    def classes(self) -> int:
+        return len(self.class_counts)
+
+
+def _profile_from_folds(folds: typing.Iterable[ClassificationFoldData]) -> DatasetProfile:
+    # test parts of cross-validation folds cover every instance exactly once
+    instances = 0
+    features = 0
+    dtypes = []
+    class_counts = collections.Counter()
+    for fold in folds:
+        x_test = np.asarray(fold.x_test)
+        instances += len(x_test)
+        features = x_test.shape[1] if x_test.ndim > 1 else 0
+        dtypes = [str(x_test.dtype)] * features
+        values, counts = np.unique(np.asarray(fold.y_test), return_counts=True)
+        class_counts.update(dict(zip(values.tolist(), counts.tolist())))
+    return DatasetProfile(
+        instances=instances,
+        features=features,
+        class_counts=dict(sorted(class_counts.items())),
+        dtypes=dtypes,
+    )
+
+
+def _profile_to_json(profile: DatasetProfile) -> dict:
+    content = dataclasses.asdict(profile)
+    # JSON object keys are always strings, pairs keep original labels types
+    content['class_counts'] = list(profile.class_counts.items())
+    return content
+
+
+def _profile_from_json(content: dict) -> DatasetProfile:
+    return DatasetProfile(**{**content, 'class_counts': {label: count for label, count in content['class_counts']}})
+
+
+def _write_json(path: Path, content: dict):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(content, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _save_array(path: Path, array: np.ndarray):
+    np.save(path, array, allow_pickle=array.dtype.hasobject)
+
+
+def _load_array(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # arrays with python objects (eg. not converted categorical values) can't be memory-mapped
+        return np.load(path, allow_pickle=True)
+
+
+def _read_json(path: Path) -> typing.Optional[dict]:
+    try:
+        with path.open('r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ClassificationDatasetStream:
+    """
+    Class that represents shuffled samples of dataset materialized once, so they can be streamed many times
+    (eg. for every incremental classifier) with minimal per sample allocation.
+    """
+
+    # number of samples converted to python values at once when stream is iterated
+    chunk_size = 10000
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        """
+        Initializes dataset stream.
+
+        :param x: features of samples in stream order
+        :param y: labels of samples in stream order
+        """
+        self.x = x
+        self.y = y
+        self.keys = tuple(range(x.shape[1])) if x.ndim > 1 else ()
+
+    def __len__(self):
+        return len(self.y)
+
+    def batches(self, batch_size: int) -> typing.Iterator[typing.Tuple[int, pd.DataFrame, pd.Series]]:
+        """
+        Splits stream into consecutive batches.
+
+        :param batch_size: number of samples in batch
+        :return: iterator of batch start index, batch features and batch labels
+        """
+        columns = list(self.keys)
+        for start in range(0, len(self.y), batch_size):
+            yield start, pd.DataFrame(self.x[start:start + batch_size], columns=columns), \
+                pd.Series(self.y[start:start + batch_size])
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[dict, typing.Any]]:
+        keys = self.keys
+        # converting chunk of array at once is much faster than converting every value separately,
+        # while chunks keep number of python objects bounded for long streams
+        for start in range(0, len(self.y), self.chunk_size):
+            end = start + self.chunk_size
+            for x_values, y in zip(self.x[start:end].tolist(), self.y[start:end]):
+                yield dict(zip(keys, x_values)), y
+
+
 class ClassificationFoldDataModifierBase(ABC):
 
     @abstractmethod
@@ -87,15 +227,51 @@ class ClassificationDatasetMinimalBase(ABC):
     ) -> typing.Iterable[ClassificationFoldData]:
         pass
 
-    def __iter__(self):
+    def profile(self) -> DatasetProfile:
+        """
+        Gets dataset profile (instances, features, class counts and features types), it is computed once
+        in single pass over dataset folds and reused.
+
+        :return: dataset profile
+        """
+        profile = getattr(self, '_profile', None)
+        if profile is None:
+            profile = self._profile = self._compute_profile()
+        return profile
+
+    def _compute_profile(self) -> DatasetProfile:
+        return _profile_from_folds(self.folds())
+
+    def stream(self) -> ClassificationDatasetStream:
+        """
+        Gets samples of dataset in stream order (test parts of folds, each shuffled), the order is materialized once
+        for dataset seed and reused.
+
+        :return: dataset stream
+        """
+        cached = getattr(self, '_stream', None)
+        if cached is not None and cached[0] == self.seed:
+            return cached[1]
+
         random_state = np.random.RandomState(seed=self.seed)
+        x_parts = []
+        y_parts = []
         for fold in self.folds():
             idx = random_state.permutation(np.arange(len(fold.x_test)))
-            x_test = fold.x_test[idx]
-            y_test = fold.y_test[idx]
-            for x_data, y in zip(x_test, y_test):
-                x = {i: value for i, value in enumerate(x_data)}
-                yield x, y
+            x_parts.append(np.asarray(fold.x_test)[idx])
+            y_parts.append(np.asarray(fold.y_test)[idx])
+        stream = ClassificationDatasetStream(np.concatenate(x_parts), np.concatenate(y_parts))
+        self._stream = (self.seed, stream)
+        return stream
+
+    def release_stream(self):
+        """
+        Releases materialized stream, so its arrays are not kept in memory after dataset evaluation.
+        """
+        self._stream = None
+
+    def __iter__(self):
+        return iter(self.stream())
 
 
 class ClassificationDatasetBase(ClassificationDatasetMinimalBase):
@@ -151,7 +327,7 @@ class ClassificationDataset(ClassificationDatasetBase):
         Initializes class instance that represents KEEL single dataset.
 
         :param name: KEEL dataset name
-        :param files_cache_path: optional cache file patch where dataset will be downloaded
+        :param files_cache_path: optional cache file patch where dataset will be downloaded and its parsed folds stored
         """
 
         super().__init__(seed)
@@ -209,23 +385,100 @@ class ClassificationDataset(ClassificationDatasetBase):
         else:
             data_name = f'{self.name}-{n_folds}'
 
-        for fold_index in range(1, n_folds + 1):
-            train_data_path = data_path.joinpath(f'{data_name}-{fold_index}tra.dat')
-            x_tra, y_tra = self._load_data(train_data_path, categorical_to_numerical)
-
-            test_data_path = data_path.joinpath(f'{data_name}-{fold_index}tst.dat')
-            x_tst, y_tst = self._load_data(test_data_path, categorical_to_numerical)
-
-            labels = np.unique(np.hstack([y_tra, y_tst]))
-
-            yield ClassificationFoldData(
-                index=fold_index,
-                x_train=x_tra,
-                y_train=y_tra,
-                x_test=x_tst,
-                y_test=y_tst,
-                labels=labels
-            )
+        data_paths = [
+            (data_path.joinpath(f'{data_name}-{fold_index}tra.dat'),
+             data_path.joinpath(f'{data_name}-{fold_index}tst.dat'))
+            for fold_index in range(1, n_folds + 1)
+        ]
+        cache_dir = self._folds_cache_path().joinpath(
+            f'{zip_data_name}-{"numerical" if categorical_to_numerical else "raw"}'
+        )
+        cache_meta = {
+            'version': FOLDS_CACHE_VERSION,
+            'sources': [[p.name, p.stat().st_size, p.stat().st_mtime_ns] for paths in data_paths for p in paths]
+        }
+
+        if _read_json(cache_dir.joinpath('meta.json')) == cache_meta:
+            for fold_index in range(1, n_folds + 1):
+                yield ClassificationFoldData(
+                    index=fold_index,
+                    **{a: _load_array(cache_dir.joinpath(f'{fold_index}-{a}.npy')) for a in FOLD_ARRAYS}
+                )
+            return
+
+        cache_dir.parent.mkdir(exist_ok=True, parents=True)
+        tmp_cache_dir = Path(tempfile.mkdtemp(prefix=f'{cache_dir.name}.', dir=cache_dir.parent))
+        try:
+            for fold_index, (train_data_path, test_data_path) in enumerate(data_paths, start=1):
+                x_tra, y_tra = self._load_data(train_data_path, categorical_to_numerical)
+                x_tst, y_tst = self._load_data(test_data_path, categorical_to_numerical)
+
+                labels = np.unique(np.hstack([y_tra, y_tst]))
+
+                fold = ClassificationFoldData(
+                    index=fold_index,
+                    x_train=x_tra,
+                    y_train=y_tra,
+                    x_test=x_tst,
+                    y_test=y_tst,
+                    labels=labels
+                )
+                for a in FOLD_ARRAYS:
+                    _save_array(tmp_cache_dir.joinpath(f'{fold_index}-{a}.npy'), getattr(fold, a))
+                yield fold
+
+            with tmp_cache_dir.joinpath('meta.json').open('w') as f:
+                json.dump(cache_meta, f)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            try:
+                os.replace(tmp_cache_dir, cache_dir)
+            except OSError:
+                # other process has just stored the same folds
+                pass
+        finally:
+            shutil.rmtree(tmp_cache_dir, ignore_errors=True)
+
+    def _folds_cache_path(self) -> Path:
+        return self._files_cache_path.joinpath('parsed')
+
+    def _compute_profile(self) -> DatasetProfile:
+        description_path = self._fetch_file(f'{self.name}-names.txt')
+        profile_path = self._folds_cache_path().joinpath(f'{self.name}-profile.json')
+        profile_meta = {
+            'version': PROFILE_VERSION,
+            'source': [description_path.name, description_path.stat().st_size, description_path.stat().st_mtime_ns]
+        }
+        stored = _read_json(profile_path)
+        if stored and stored.get('meta') == profile_meta:
+            return _profile_from_json(stored['profile'])
+
+        class_counts = self._parsed_class_counts()
+        profile = DatasetProfile(
+            instances=self.instances,
+            features=self.features,
+            # description has no class distribution, only number of classes which are converted to codes by folds
+            class_counts=class_counts if class_counts is not None else {label: None for label in range(self.classes)},
+            dtypes=[t for n, t in self._attributes.items() if n != self._output_name],
+        )
+        if class_counts is not None:
+            _write_json(profile_path, {'meta': profile_meta, 'profile': _profile_to_json(profile)})
+        return profile
+
+    def _parsed_class_counts(self) -> typing.Optional[typing.Dict[typing.Any, int]]:
+        # class distribution is counted only from test parts of folds that were already parsed and cached
+        for n_folds in (10, 5):
+            for kind in ('dobscv', 'fold'):
+                cache_dir = self._folds_cache_path().joinpath(f'{self.name}-{n_folds}-{kind}-numerical')
+                cache_meta = _read_json(cache_dir.joinpath('meta.json'))
+                if not cache_meta or cache_meta.get('version') != FOLDS_CACHE_VERSION:
+                    continue
+                class_counts = collections.Counter()
+                for fold_index in range(1, n_folds + 1):
+                    y_test = _load_array(cache_dir.joinpath(f'{fold_index}-y_test.npy'))
+                    values, counts = np.unique(y_test, return_counts=True)
+                    class_counts.update(dict(zip(values.tolist(), counts.tolist())))
+                return dict(sorted(class_counts.items()))
+        return None
 
     def _load_description(self):
         file_name = f'{self.name}-names.txt'
@@ -318,6 +571,11 @@ class LocalClassificationDataset(ClassificationDataset):
     def _fetch_data(self, data_name: str, dob_scv: bool) -> Path:
         return self._files_cache_path
 
+    def _folds_cache_path(self) -> Path:
+        # do not write into dataset directory, keep parsed folds in default files cache
+        directory_hash = hashlib.sha1(str(self._files_cache_path.resolve()).encode()).hexdigest()[:12]
+        return Path.home().joinpath('cacp_files').joinpath('parsed').joinpath(f'local-{directory_hash}')
+
     def _fetch_file(self, file_name: str) -> Path:
         return self._files_cache_path.joinpath(file_name)
 
@@ -376,10 +634,16 @@ class LocalCsvClassificationDataset(ClassificationDatasetBase):
 
     def _load_metadata(self):
         df = self._df()
-        self._instances = len(df)
-        self._features = len(df.columns) - 1
         self._output_name = df.columns[-1]
-        self._classes = len(df[self._output_name].unique())
+        self._profile = DatasetProfile(
+            instances=len(df),
+            features=len(df.columns) - 1,
+            class_counts={k: int(v) for k, v in df[self._output_name].value_counts().sort_index().items()},
+            dtypes=[t.name for t in df.dtypes[:-1]],
+        )
+        self._instances = self._profile.instances
+        self._features = self._profile.features
+        self._classes = self._profile.classes
 
     def __init__(self, name: str, dataset_path: Path):
         """
@@ -398,6 +662,38 @@ class LocalCsvClassificationDataset(ClassificationDatasetBase):
         self._load_metadata()
 
 
+def dataset_profile(dataset: typing.Union[ClassificationDatasetMinimalBase, typing.Iterable]) -> DatasetProfile:
+    """
+    Gets profile of dataset, datasets that are not cacp datasets (eg. river datasets) are profiled by single
+    iteration over their samples.
+
+    :param dataset: dataset
+    :return: dataset profile
+    """
+    if isinstance(dataset, ClassificationDatasetMinimalBase):
+        return dataset.profile()
+
+    profile = getattr(dataset, '_cacp_profile', None)
+    if profile is None:
+        instances = 0
+        x = {}
+        class_counts = collections.Counter()
+        for x, y in dataset:
+            instances += 1
+            class_counts[y] += 1
+        profile = DatasetProfile(
+            instances=instances,
+            features=len(x),
+            class_counts=dict(class_counts),
+            dtypes=[type(v).__name__ for v in x.values()],
+        )
+        try:
+            dataset._cacp_profile = profile
+        except AttributeError:
+            pass
+    return profile
+
+
 def all_datasets() -> typing.List[ClassificationDataset]:
     """
     Gets all available datasets
@@ -3,7 +3,7 @@ import traceback
 import dash_bootstrap_components as dbc
 from dash import html, Output, callback, Input, no_update
 
-from cacp import run_experiment, run_incremental_experiment
+from cacp import run_experiment, run_incremental_experiment, TaskCache
 from cacp.gui.components.shared.utils import GLOBAL_LOCATION_ID
 from cacp.gui.db.experiments import get_experiment, ExperimentStatus, ExperimentType, update_experiment_status
 from cacp.gui.external.classifier import parse_classifier
@@ -74,6 +74,7 @@ class ExperimentProcessor(html.Div):
                                 experiment["path"],
                                 metrics,
                                 progress=progress,
+                                task_cache=TaskCache(),
                             )
                         elif experiment_type == ExperimentType.INCREMENTAL:
                             update_experiment_status(experiment_id, ExperimentStatus.RUNNING)
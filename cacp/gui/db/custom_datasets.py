@@ -13,6 +13,7 @@ from tinydb.table import Document
 
 from cacp.comparison import process_comparison_single, DEFAULT_METRICS, process_incremental_comparison_single, \
     DEFAULT_INCREMENTAL_METRICS
+from cacp.dataset import dataset_profile
 from cacp.gui.custom.datasets import CUSTOM_DATASETS_CODE_DIR
 from cacp.gui.external.dataset import parse_dataset
 from cacp.gui.preview import preview_prevent_modifications
@@ -185,11 +186,7 @@ def test_custom_dataset_code(custom_dataset_id: int, name_value: str, code_value
         )
         ds_fold = next(ds.folds())
 
-        #  count classes
-        labels = set()
-        for _, y in ds:
-            labels.add(y)
-        number_of_classes = len(labels)
+        number_of_classes = dataset_profile(ds).classes
 
         # test if works for BATCH
         process_comparison_single(lambda n_inputs, n_classes: DummyClassifier(), "test", ds, ds_fold, DEFAULT_METRICS)
@@ -0,0 +1,174 @@
+import dataclasses
+import itertools
+import math
+import typing
+from pathlib import Path
+
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+
+from cacp.comparison import process_comparison, write_comparison, DEFAULT_METRICS
+from cacp.dataset import ClassificationDatasetBase, AVAILABLE_N_FOLDS
+from cacp.journal import ResultJournal
+from cacp.util import to_latex
+
+
+@dataclasses.dataclass(frozen=True)
+class GridVariant:
+    """
+    Classifier factory of single parameters grid variant.
+    """
+
+    estimator: typing.Callable
+    params: typing.Dict[str, typing.Any]
+
+    def __call__(self, n_inputs: int, n_classes: int):
+        return self.estimator(**self.params)
+
+
+class ClassifierGrid:
+    """
+    Parameters grid of classifier that is expanded into named classifier variants.
+    """
+
+    def __init__(self, name: str, estimator: typing.Callable,
+                 param_grid: typing.Union[typing.Dict[str, typing.Sequence], typing.List[typing.Dict]],
+                 fixed_params: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        """
+        Initializes classifier grid.
+
+        :param name: classifier name, used as prefix of variants names
+        :param estimator: classifier class or function that creates classifier from parameters
+        :param param_grid: parameters grid (dictionary of parameter values or list of such dictionaries)
+        :param fixed_params: parameters shared by all variants
+        """
+        self.name = name
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.fixed_params = fixed_params or {}
+
+    def classifiers(self) -> typing.List[typing.Tuple[str, typing.Callable]]:
+        """
+        Expands parameters grid.
+
+        :return: classifiers collection with one classifier for every parameters combination
+        """
+        classifiers = []
+        for params in ParameterGrid(self.param_grid):
+            name = f"{self.name}({','.join(f'{k}={v}' for k, v in sorted(params.items()))})"
+            classifiers.append((name, GridVariant(self.estimator, {**self.fixed_params, **params})))
+        return classifiers
+
+
+@dataclasses.dataclass
+class SuccessiveHalving:
+    """
+    Successive halving settings, classifiers are evaluated on growing number of folds (rungs) and only the best
+    1 / factor of them is promoted to the next rung, the last rung uses all folds.
+
+    :param metric: primary metric name used to rank classifiers (higher is better), None uses first metric
+    :param factor: reduction factor of classifiers and growth factor of folds between rungs
+    :param min_folds: number of folds used in the first rung
+    """
+
+    metric: typing.Optional[str] = None
+    factor: int = 3
+    min_folds: int = 1
+
+    def rungs(self, n_classifiers: int, n_folds: int) -> typing.List[int]:
+        """
+        Calculates number of folds of every rung.
+
+        :param n_classifiers: number of classifiers
+        :param n_folds: number of all folds
+        :return: number of folds in every rung
+        """
+        n_rungs = 1
+        while n_classifiers > self.factor ** (n_rungs - 1) * self.factor \
+                and n_folds / self.factor ** n_rungs >= self.min_folds:
+            n_rungs += 1
+        folds = [max(math.ceil(n_folds / self.factor ** (n_rungs - 1 - rung)), self.min_folds) for rung in
+                 range(n_rungs)]
+        return sorted(set(min(f, n_folds) for f in folds))
+
+
+def process_halving_comparison(
+    halving: SuccessiveHalving,
+    datasets: typing.List[ClassificationDatasetBase],
+    classifiers: typing.List[typing.Tuple[str, typing.Callable]],
+    result_dir: Path,
+    metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+    n_folds: AVAILABLE_N_FOLDS = 10,
+    resume: bool = False,
+    **comparison_kwargs
+) -> typing.List[str]:
+    """
+    Runs comparison with successive halving, each rung extends results of promoted classifiers with next folds,
+    so results of previous rungs are reused.
+
+    :param halving: successive halving settings
+    :param datasets: dataset collection
+    :param classifiers: classifiers collection
+    :param result_dir: results directory
+    :param metrics: metrics collection
+    :param n_folds: number of folds {5,10}
+    :param resume: if tasks already stored in results journal should be skipped
+    :param comparison_kwargs: other process_comparison arguments
+    :return: names of classifiers evaluated on all folds
+    """
+    metric = halving.metric or metrics[0][0]
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    dataset_names = [dataset.name for dataset in datasets]
+    classifier_names = [c_n for c_n, _ in classifiers]
+
+    rungs = halving.rungs(len(classifiers), n_folds)
+    promoted = list(classifiers)
+    records = {}
+    for rung, rung_folds in enumerate(rungs, start=1):
+        folds = list(range(1, rung_folds + 1))
+        process_comparison(datasets, promoted, result_dir, metrics, n_folds=n_folds, folds=folds,
+                           resume=resume or rung > 1, **comparison_kwargs)
+
+        df = journal.to_frame()
+        promoted_names = [c_n for c_n, _ in promoted]
+        df = df[df['Dataset'].isin(dataset_names) & df['Algorithm'].isin(promoted_names) & df['CV index'].isin(folds)]
+        means = df.groupby('Algorithm')[metric].mean().reindex(promoted_names).fillna(0)
+        for c_n in promoted_names:
+            records[c_n] = {'Algorithm': c_n, 'Rung': rung, 'Evaluated folds': rung_folds, metric: means[c_n]}
+
+        if rung < len(rungs):
+            n_promoted = max(math.ceil(len(promoted) / halving.factor), 1)
+            best = set(means.sort_values(ascending=False, kind='stable').index[:n_promoted])
+            promoted = [(c_n, c) for c_n, c in promoted if c_n in best]
+
+    write_comparison(journal, result_dir, itertools.product(dataset_names, classifier_names, range(1, n_folds + 1)))
+    finalists = [c_n for c_n, _ in promoted]
+    process_halving_results([records[c_n] for c_n in classifier_names], finalists, result_dir, metric)
+    return finalists
+
+
+def process_halving_results(records: typing.List[dict], finalists: typing.List[str], result_dir: Path, metric: str):
+    """
+    Writes successive halving report with rung reached by every classifier.
+
+    :param records: last rung results of every classifier
+    :param finalists: names of classifiers evaluated on all folds
+    :param result_dir: results directory
+    :param metric: primary metric
+
+    """
+    halving_dir = result_dir.joinpath('halving')
+    halving_dir.mkdir(exist_ok=True, parents=True)
+    df = pd.DataFrame(records)
+    df.insert(1, 'Status', ['finished' if c_n in finalists else 'eliminated' for c_n in df['Algorithm']])
+    df = df.sort_values(by=['Rung', metric], ascending=False)
+    df.reset_index(drop=True, inplace=True)
+    df.index += 1
+    df.to_csv(halving_dir.joinpath('halving.csv'), index=True)
+    halving_dir.joinpath('halving.tex').open('w').write(
+        to_latex(
+            df,
+            caption=f'Successive halving of classifiers for {metric}',
+            label='tab:halving',
+        )
+    )
@@ -5,7 +5,7 @@ from pathlib import Path
 import pandas as pd
 import river.datasets.base
 
-from cacp.dataset import ClassificationDatasetBase
+from cacp.dataset import ClassificationDatasetBase, dataset_profile
 from cacp.util import to_latex
 
 
@@ -24,17 +24,12 @@ def dataset_info(datasets: typing.Iterable[typing.Union[ClassificationDatasetBas
         if hasattr(dataset, "name"):
             name = dataset.name
 
-        i = 0
-        x = {}
-        labels = set()
-        for i, (x, y) in enumerate(dataset):
-            labels.add(y)
-
+        profile = dataset_profile(dataset)
         row = {
             'Dataset': name,
-            'Instances': i + 1,
-            'Features': len(x),
-            'Classes': len(labels),
+            'Instances': profile.instances,
+            'Features': profile.features,
+            'Classes': profile.classes,
         }
         records.append(row)
 
@@ -0,0 +1,107 @@
+import json
+import os
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class ResultJournal:
+    """
+    Append-only journal of finished comparison tasks, stored as JSON lines in results directory.
+    Only new rows are written while experiment runs, sorted comparison results are built from it once at the end.
+    """
+
+    def __init__(self, path: Path, key_columns: typing.Sequence[str]):
+        """
+        Initializes result journal.
+
+        :param path: journal file path
+        :param key_columns: columns that identify single task
+        """
+        self.path = path
+        self.key_columns = tuple(key_columns)
+
+    @property
+    def settings_path(self) -> Path:
+        return self.path.with_name(f'{self.path.stem}_settings.json')
+
+    def open(self, settings: dict, resume: bool):
+        """
+        Prepares journal for experiment, journal is cleared if experiment is not resumed or if it was stored
+        with different settings, so tasks computed on other folds or with other metrics are not reused.
+
+        :param settings: experiment settings that change results of tasks
+        :param resume: if tasks already stored in journal should be kept
+        """
+        settings = json.loads(json.dumps(settings, default=_json_default))
+        if resume and self.path.exists() and self.settings() != settings:
+            print(f'Results journal {self.path} was stored with different settings, it will be cleared')
+            resume = False
+        if not resume:
+            self.clear()
+        with self.settings_path.open('w', encoding='utf-8') as f:
+            json.dump(settings, f)
+
+    def settings(self) -> typing.Optional[dict]:
+        try:
+            with self.settings_path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def key(self, row: dict) -> tuple:
+        return tuple(row[c] for c in self.key_columns)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+    def append(self, row: dict):
+        line = json.dumps(row, default=_json_default) + '\n'
+        if self._ends_with_incomplete_line():
+            line = '\n' + line
+        with self.path.open('a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def rewrite(self, rows: typing.Iterable[dict]):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, default=_json_default) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _ends_with_incomplete_line(self) -> bool:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return False
+        with self.path.open('rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def rows(self) -> typing.Iterator[dict]:
+        if not self.path.exists():
+            return
+        with self.path.open('r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # last line can be incomplete if process was killed while writing
+                    continue
+
+    def keys(self) -> typing.Set[tuple]:
+        return {self.key(row) for row in self.rows()}
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame.from_records(self.rows())
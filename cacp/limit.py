@@ -0,0 +1,191 @@
+import atexit
+import io
+import mmap
+import signal
+import threading
+import typing
+from enum import Enum
+
+import numpy as np
+
+try:
+    import cloudpickle
+except ImportError:  # older joblib versions ship their own copy
+    from joblib.externals import cloudpickle
+from joblib.externals.loky.backend import get_context
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+LIMIT = typing.Union[None, float, typing.Dict[str, float]]
+
+
+class TaskStatus(str, Enum):
+    OK = "OK"
+    TIMEOUT = "TIMEOUT"
+    OOM = "OOM"
+    ERROR = "ERROR"
+
+
+def limit_for(limit: LIMIT, classifier_name: str) -> typing.Optional[float]:
+    """
+    Gets limit for classifier.
+
+    :param limit: single limit for all classifiers or dictionary of limits per classifier name
+    :param classifier_name: classifier name
+    :return: limit value or None if classifier is not limited
+
+    """
+    if isinstance(limit, dict):
+        return limit.get(classifier_name)
+    return limit
+
+
+def _load_memmap(filename: str, dtype: np.dtype, mode: str, offset: int, shape: tuple, order: str) -> np.memmap:
+    return np.memmap(filename, dtype=dtype, mode=mode, offset=offset, shape=shape, order=order)
+
+
+class _PayloadPickler(cloudpickle.Pickler):
+    """
+    Pickles memory-mapped arrays (eg. shared folds) as references to their files, so they are mapped by limited
+    process instead of being copied into every task payload.
+    """
+
+    def reducer_override(self, obj):
+        # only whole mapped arrays are referenced, views of them are copied as any other array
+        if isinstance(obj, np.memmap) and isinstance(obj.base, mmap.mmap) and obj.filename is not None:
+            order = 'F' if obj.flags.f_contiguous and not obj.flags.c_contiguous else 'C'
+            mode = 'r+' if obj.mode in ('r+', 'w+') else obj.mode
+            return _load_memmap, (obj.filename, obj.dtype, mode, obj.offset, obj.shape, order)
+        return super().reducer_override(obj)
+
+
+def _dumps(obj) -> bytes:
+    buffer = io.BytesIO()
+    _PayloadPickler(buffer).dump(obj)
+    return buffer.getvalue()
+
+
+def _set_memory_limit(memory_limit: typing.Optional[float]):
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = hard if memory_limit is None else int(memory_limit * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _serve_limited(connection):
+    # runs tasks one by one until parent closes connection, so interpreter start-up is paid once per worker
+    while True:
+        try:
+            payload, memory_limit = connection.recv()
+        except EOFError:
+            break
+        _set_memory_limit(memory_limit)
+        try:
+            func, args = cloudpickle.loads(payload)
+            # signals that task is loaded, so loading is not counted in time limit
+            connection.send(None)
+            connection.send((TaskStatus.OK, func(*args)))
+        except MemoryError as e:
+            connection.send((TaskStatus.OOM, repr(e)))
+        except Exception as e:
+            connection.send((TaskStatus.ERROR, repr(e)))
+        finally:
+            func = args = None
+    connection.close()
+
+
+class _LimitedProcess:
+    """
+    Child process that runs limited tasks, it is reused by following tasks until it is killed (eg. on timeout).
+    """
+
+    def __init__(self):
+        # loky context starts fresh interpreter and also works inside joblib worker processes
+        context = get_context('loky')
+        self.connection, child_connection = context.Pipe(duplex=True)
+        # daemon process is terminated instead of joined when its parent exits
+        self.process = context.Process(target=_serve_limited, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def close(self):
+        self.connection.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+_limited = threading.local()
+
+
+def _limited_process() -> _LimitedProcess:
+    process = getattr(_limited, 'process', None)
+    if process is None or not process.process.is_alive():
+        if process is not None:
+            process.close()
+        process = _limited.process = _LimitedProcess()
+        atexit.register(process.close)
+    return process
+
+
+def _discard_limited_process():
+    process = getattr(_limited, 'process', None)
+    _limited.process = None
+    if process is not None:
+        atexit.unregister(process.close)
+        process.close()
+
+
+def run_with_limits(
+    func: typing.Callable,
+    args: tuple,
+    time_limit: typing.Optional[float] = None,
+    memory_limit: typing.Optional[float] = None
+) -> typing.Tuple[TaskStatus, typing.Any]:
+    """
+    Runs function with wall-clock time and memory limits. If any limit is set, function is executed in separate
+    process that is killed when time limit is exceeded, memory limit is applied to its address space
+    (on systems that support it). The process is reused by following tasks of the same thread as long as it is alive
+    and memory-mapped arguments (eg. shared folds) are passed as references to their files.
+
+    :param func: function to run
+    :param args: function arguments
+    :param time_limit: wall-clock time limit in seconds
+    :param memory_limit: memory limit in megabytes
+    :return: task status and function result (or error description if task did not finish successfully)
+
+    """
+    if time_limit is None and memory_limit is None:
+        try:
+            return TaskStatus.OK, func(*args)
+        except MemoryError as e:
+            return TaskStatus.OOM, repr(e)
+        except Exception as e:
+            return TaskStatus.ERROR, repr(e)
+
+    payload = _dumps((func, args))
+    limited = _limited_process()
+    connection, process = limited.connection, limited.process
+    try:
+        connection.send((payload, memory_limit))
+        started = connection.recv()
+        if started is not None:
+            # function could not be loaded in child process
+            return started
+        if connection.poll(time_limit):
+            return connection.recv()
+    except (EOFError, OSError):
+        # process died without sending result
+        _discard_limited_process()
+        if memory_limit is not None and process.exitcode == -getattr(signal, 'SIGKILL', 9):
+            return TaskStatus.OOM, f'process killed, exit code {process.exitcode}'
+        return TaskStatus.ERROR, f'process died, exit code {process.exitcode}'
+    # process is still running the task, so it is killed and next task starts new one
+    process.terminate()
+    _discard_limited_process()
+    return TaskStatus.TIMEOUT, f'time limit of {time_limit}s exceeded'
@@ -0,0 +1,185 @@
+import dataclasses
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import typing
+from pathlib import Path
+
+import joblib
+import numpy as np
+from joblib import Parallel
+
+from cacp.dataset import ClassificationFoldData, FOLD_ARRAYS
+
+# joblib>=1.4 can yield results in completion order, older versions yield them in submission order
+_RETURN_AS = 'generator_unordered' if tuple(int(v) for v in joblib.__version__.split('.')[:2]) >= (1, 4) \
+    else 'generator'
+
+
+def resolve_n_jobs(n_jobs: typing.Optional[int], n_tasks: int) -> int:
+    """
+    Resolves number of parallel workers.
+
+    :param n_jobs: requested number of workers, None uses all cores, negative values follow joblib convention
+    :param n_tasks: number of tasks that will be processed
+    :return: number of workers
+
+    """
+    cpu_count = joblib.cpu_count()
+    if n_jobs is None:
+        n_jobs = cpu_count
+    elif n_jobs < 0:
+        n_jobs = max(cpu_count + 1 + n_jobs, 1)
+    return max(min(n_jobs, n_tasks), 1)
+
+
+def balance_workers(n_jobs: typing.Optional[int], threads_per_job: typing.Optional[int],
+                    n_tasks: int) -> typing.Tuple[int, int]:
+    """
+    Balances number of parallel workers against number of native threads (BLAS, OpenMP) used by each of them,
+    so all workers together do not use more threads than available cores.
+
+    :param n_jobs: requested number of workers, None uses all cores or cores divided by threads per job
+    :param threads_per_job: requested number of native threads per worker, None divides cores between workers
+    :param n_tasks: number of tasks that will be processed
+    :return: number of workers and number of threads per worker
+
+    """
+    cpu_count = joblib.cpu_count()
+    if n_jobs is None and threads_per_job is not None:
+        n_jobs = max(cpu_count // threads_per_job, 1)
+    n_workers = resolve_n_jobs(n_jobs, n_tasks)
+    if threads_per_job is None:
+        threads_per_job = max(cpu_count // n_workers, 1)
+    return n_workers, threads_per_job
+
+
+def parallel_unordered(tasks: typing.Iterable, n_jobs: int) -> typing.Iterator:
+    """
+    Submits tasks to single worker pool and yields results as they finish.
+
+    :param tasks: iterable of joblib delayed tasks, consumed lazily
+    :param n_jobs: number of workers
+    :return: iterator of task results
+
+    """
+    return Parallel(n_jobs=n_jobs, return_as=_RETURN_AS)(tasks)
+
+
+def prefetch(iterable: typing.Iterable, depth: int) -> typing.Iterator:
+    """
+    Consumes iterable in background thread, so items are prepared while previous ones are processed.
+
+    :param iterable: iterable of items to prepare
+    :param depth: maximum number of items prepared ahead, 0 disables prefetching
+    :return: iterator of prepared items
+
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item, error=None):
+        while not stopped.is_set():
+            try:
+                items.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(end)
+        except BaseException as e:
+            put(end, e)
+
+    thread = threading.Thread(target=produce, name='cacp-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+@dataclasses.dataclass(frozen=True)
+class DatasetHandle:
+    """
+    Lightweight dataset reference sent to worker processes instead of whole dataset object.
+    """
+
+    name: str
+
+
+class SharedFoldStore:
+    """
+    Stores fold arrays once in memory-mapped files, so worker processes receive lightweight file handles
+    instead of pickled copies of the arrays for every task.
+    """
+
+    def __init__(self, enabled: bool = True, temp_folder: typing.Optional[str] = None):
+        """
+        Initializes shared fold store.
+
+        :param enabled: if arrays should be shared, disabled store returns folds unchanged (eg. for single worker)
+        :param temp_folder: directory for memory-mapped files, defaults to JOBLIB_TEMP_FOLDER or system temp directory
+        """
+        self._directory = None
+        if enabled:
+            temp_folder = temp_folder or os.environ.get('JOBLIB_TEMP_FOLDER')
+            self._directory = Path(tempfile.mkdtemp(prefix='cacp_folds_', dir=temp_folder))
+        self._count = 0
+
+    def share(self, fold: ClassificationFoldData) -> typing.Tuple[ClassificationFoldData, typing.Optional[Path]]:
+        """
+        Places fold arrays in memory-mapped files.
+
+        :param fold: fold data
+        :return: fold data backed by memory-mapped files and fold directory used to release it
+        """
+        if self._directory is None:
+            return fold, None
+        self._count += 1
+        fold_dir = self._directory.joinpath(str(self._count))
+        fold_dir.mkdir()
+        arrays = {}
+        for name in FOLD_ARRAYS:
+            array = getattr(fold, name)
+            # arrays from parsed folds cache are already memory-mapped, arrays with python objects can't be
+            if isinstance(array, np.ndarray) and getattr(array, 'filename', None) is None \
+                    and not array.dtype.hasobject:
+                path = fold_dir.joinpath(f'{name}.npy')
+                np.save(path, array, allow_pickle=False)
+                array = np.load(path, mmap_mode='r')
+            arrays[name] = array
+        return ClassificationFoldData(index=fold.index, **arrays), fold_dir
+
+    @staticmethod
+    def release(fold_dir: typing.Optional[Path]):
+        if fold_dir is not None:
+            shutil.rmtree(fold_dir, ignore_errors=True)
+
+    def close(self):
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
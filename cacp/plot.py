@@ -3,69 +3,130 @@ from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from joblib import delayed
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 from cacp.comparison import DEFAULT_METRICS, DEFAULT_INCREMENTAL_METRICS
+from cacp.curve import curve_files, downsample_curve, read_downsampled_curve
+from cacp.parallel import parallel_unordered, resolve_n_jobs
+from cacp.result import comparison_results
+
+DEFAULT_PLOT_FORMATS = ('eps', 'png')
+
+DEFAULT_PLOT_POINTS = 2000
+
+
+@dataclass
+class Line:
+    x: np.ndarray
+    y: np.ndarray
+    label: str = ''
+
+
+def _new_figure() -> Figure:
+    # figure is not managed by pyplot, so it is rendered by non-interactive Agg backend in any process
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def _plot_paths(plot_dir: Path, file_name: str, formats: typing.Sequence[str]) -> typing.List[Path]:
+    return [plot_dir.joinpath(f'{file_name}.{plot_format}') for plot_format in formats]
+
+
+def _up_to_date(paths: typing.List[Path], sources: typing.List[Path]) -> bool:
+    try:
+        sources_time = max(source.stat().st_mtime for source in sources)
+        return all(path.stat().st_mtime >= sources_time for path in paths)
+    except (OSError, ValueError):
+        return False
+
+
+def _render_boxplot(df: pd.DataFrame, column: str, paths: typing.List[Path]):
+    figure = _new_figure()
+    ax = figure.add_subplot()
+    df.boxplot(ax=ax, return_type='axes')
+    ax.set_title('')
+    ax.set_ylabel(column)
+    ax.set_xlabel('Algorithm')
+    ax.tick_params(axis='x', labelrotation=90)
+    figure.tight_layout()
+    for path in paths:
+        figure.savefig(path)
+
+
+def _render_lines(lines: typing.List[Line], y_label: str, paths: typing.List[Path]):
+    figure = _new_figure()
+    ax = figure.add_subplot()
+    for line in lines:
+        ax.plot(line.x, line.y, label=line.label)
+    ax.set_xlabel('Number of samples')
+    ax.set_ylabel(y_label)
+    if len(lines) > 1:
+        ax.legend()
+    ax.set_ylim([-0.05, 1.05])
+    for path in paths:
+        figure.savefig(path)
+
+
+def _render(tasks: typing.List, n_jobs: typing.Optional[int]):
+    for _ in parallel_unordered(tasks, resolve_n_jobs(n_jobs, len(tasks))):
+        pass
 
 
 def process_comparison_results_plots(result_dir: Path,
-                                     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS):
+                                     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+                                     formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS,
+                                     n_jobs: typing.Optional[int] = None,
+                                     skip_up_to_date: bool = True,
+                                     df: typing.Optional[pd.DataFrame] = None):
     """
     Generates plots from comparison results.
 
     :param result_dir: results directory
     :param metrics: metrics collection
+    :param formats: plot files formats (eg. png, svg, eps), empty collection disables plots
+    :param n_jobs: number of parallel rendering processes, None uses all cores
+    :param skip_up_to_date: if plots newer than comparison results should not be rendered again
+    :param df: already loaded comparison results, None reads them from results directory
 
     """
-    df_results = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    if not formats:
+        return
+    comparison_path = result_dir.joinpath('comparison.csv')
     plot_dir = result_dir.joinpath('plot')
     plot_dir.mkdir(exist_ok=True, parents=True)
 
+    tasks = []
+
     def boxplot_sorted(df, by, column, file_suffix):
+        paths = _plot_paths(plot_dir, f'comparison_{column.lower()}{file_suffix}', formats)
+        if skip_up_to_date and _up_to_date(paths, [comparison_path]):
+            return
         df2 = pd.DataFrame({col: vals[column] for col, vals in df.groupby(by)})
         meds = df2.median().sort_values(ascending=False)
-        df2[meds.index].boxplot(return_type="axes")
-        plt.title('')
-        plt.suptitle('')
-        plt.ylabel(column)
-        plt.xlabel('Algorithm')
-        plt.xticks(rotation=90)
-        plt.tight_layout()
-        plt.savefig(plot_dir.joinpath(f'comparison_{column.lower()}{file_suffix}.eps'))
-        plt.savefig(plot_dir.joinpath(f'comparison_{column.lower()}{file_suffix}.png'))
-        plt.close()
+        tasks.append(delayed(_render_boxplot)(df2[meds.index], column, paths))
 
+    df_results = comparison_results(result_dir, df)
     for metric, _ in metrics:
         boxplot_sorted(df_results, column=metric, by='Algorithm', file_suffix='_per_fold')
-        boxplot_sorted(df_results.groupby(['Algorithm', 'Dataset']).mean().reset_index(level=0),
+        boxplot_sorted(df_results.groupby(['Algorithm', 'Dataset']).mean(numeric_only=True).reset_index(level=0),
                        column=metric, by='Algorithm', file_suffix='_per_dataset')
+    _render(tasks, n_jobs)
 
 
-@dataclass
-class Line:
-    x: np.ndarray
-    y: np.ndarray
-    label: str = ''
-
-
-def process_comparison_results_incremental_plot(file_name: str, y_label: str, lines: typing.List[Line], plot_dir: Path):
-    for line in lines:
-        plt.plot(line.x, line.y, label=line.label)
-    plt.xlabel('Number of samples')
-    plt.ylabel(y_label)
-    ax = plt.gca()
-    if len(lines) > 1:
-        ax.legend()
-    ax.set_ylim([-0.05, 1.05])
-    plt.savefig(plot_dir.joinpath(f'{file_name}.eps'))
-    plt.savefig(plot_dir.joinpath(f'{file_name}.png'))
-    plt.close()
+def process_comparison_results_incremental_plot(file_name: str, y_label: str, lines: typing.List[Line], plot_dir: Path,
+                                                formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS):
+    _render_lines(lines, y_label, _plot_paths(plot_dir, file_name, formats))
 
 
 def process_comparison_results_single_incremental_plot(classifier_name: str, dataset_name: str, metric: str,
-                                                       df: pd.DataFrame, incremental_plot_dir: Path):
+                                                       df: pd.DataFrame, incremental_plot_dir: Path,
+                                                       formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS,
+                                                       n_points: typing.Optional[int] = DEFAULT_PLOT_POINTS):
     """
     Generates plots from single incremental comparison results.
 
@@ -74,61 +135,90 @@ def process_comparison_results_single_incremental_plot(classifier_name: str, dat
     :param metric: metric name
     :param df: result dataframe
     :param incremental_plot_dir: output plot directory
+    :param formats: plot files formats
+    :param n_points: number of plotted points the curve is downsampled to, None plots all points
 
     """
 
     incremental_classifier_single_plot_dir = incremental_plot_dir.joinpath('single').joinpath(classifier_name)
     incremental_classifier_single_plot_dir.mkdir(exist_ok=True, parents=True)
-    line = Line(df['index'], df[metric])
+    df = downsample_curve(df, [metric], n_points)[metric]
+    line = Line(df['index'].values, df[metric].values)
     process_comparison_results_incremental_plot(
         f"{classifier_name}_{dataset_name}_{metric.lower()}",
         metric,
         [line],
-        incremental_classifier_single_plot_dir
+        incremental_classifier_single_plot_dir,
+        formats
     )
 
 
 def process_comparison_results_incremental_plots(
     result_dir: Path,
-    metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS
+    metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS,
+    formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS,
+    n_jobs: typing.Optional[int] = None,
+    skip_up_to_date: bool = True,
+    n_points: typing.Optional[int] = DEFAULT_PLOT_POINTS
 ):
     """
     Generates plots from incremental comparison results.
 
     :param result_dir: results directory
     :param metrics: metrics collection
+    :param formats: plot files formats (eg. png, svg, eps), empty collection disables plots
+    :param n_jobs: number of parallel rendering processes, None uses all cores
+    :param skip_up_to_date: if plots newer than curves they show should not be rendered again
+    :param n_points: number of plotted points every curve is downsampled to, None plots all points,
+                     downsampled curves are cached in incremental downsampled directory
 
     """
+    if not formats:
+        return
     incremental_comparison_dir = result_dir.joinpath('incremental').joinpath('result')
     incremental_plot_dir = result_dir.joinpath('incremental').joinpath('plot')
+    downsampled_dir = result_dir.joinpath('incremental').joinpath('downsampled')
     incremental_plot_dir.mkdir(exist_ok=True, parents=True)
 
-    dataset_dfs = defaultdict(list)
-    classifier_names = []
+    dataset_curves = defaultdict(list)
     metrics_names = [m for m, _ in metrics]
-
-    for classifier_dir in incremental_comparison_dir.glob("*"):
-        classifier_name = classifier_dir.stem
-        classifier_names.append(classifier_name)
-        for classifier_dataset_file in classifier_dir.glob("*.csv"):
-            dataset_name = classifier_dataset_file.stem
-            df = pd.read_csv(classifier_dataset_file)
-            dataset_dfs[dataset_name].append(df)
-            for metric in metrics_names:
-                process_comparison_results_single_incremental_plot(
-                    classifier_name,
-                    dataset_name,
-                    metric,
-                    df,
-                    incremental_plot_dir
-                )
-
-    for dataset_name, dfs in dataset_dfs.items():
-        for metric in metrics_names:
-            lines = [Line(df['index'], df[metric], classifier_names[i]) for i, df in enumerate(dfs)]
-            process_comparison_results_incremental_plot(
-                f"{dataset_name}_{metric.lower()}",
-                metric,
-                lines,
-                incremental_plot_dir
+    for classifier_dir in sorted(incremental_comparison_dir.glob("*")):
+        for dataset_name, classifier_dataset_file in curve_files(classifier_dir):
+            dataset_curves[dataset_name].append((classifier_dir.stem, classifier_dataset_file))
+
+    tasks = []
+    for dataset_name, curves in dataset_curves.items():
+        dataset_paths = {
+            metric: _plot_paths(incremental_plot_dir, f"{dataset_name}_{metric.lower()}", formats)
+            for metric in metrics_names
+        }
+        pending_dataset = [m for m in metrics_names if not (skip_up_to_date and
+                                                            _up_to_date(dataset_paths[m], [p for _, p in curves]))]
+        dataset_lines = defaultdict(list)
+        for classifier_name, curve_path in curves:
+            single_plot_dir = incremental_plot_dir.joinpath('single').joinpath(classifier_name)
+            single_paths = {
+                metric: _plot_paths(single_plot_dir, f"{classifier_name}_{dataset_name}_{metric.lower()}", formats)
+                for metric in metrics_names
+            }
+            pending_single = [m for m in metrics_names if not (skip_up_to_date and
+                                                               _up_to_date(single_paths[m], [curve_path]))]
+            if not pending_single and not pending_dataset:
+                continue
+
+            curves_dfs = read_downsampled_curve(
+                curve_path, downsampled_dir.joinpath(classifier_name).joinpath(f'{dataset_name}.npz'),
+                metrics_names, n_points
             )
+            single_plot_dir.mkdir(exist_ok=True, parents=True)
+            for metric in pending_single:
+                df = curves_dfs[metric]
+                tasks.append(delayed(_render_lines)([Line(df['index'].values, df[metric].values)], metric,
+                                                    single_paths[metric]))
+            for metric in pending_dataset:
+                df = curves_dfs[metric]
+                dataset_lines[metric].append(Line(df['index'].values, df[metric].values, classifier_name))
+
+        for metric, lines in dataset_lines.items():
+            tasks.append(delayed(_render_lines)(lines, metric, dataset_paths[metric]))
+    _render(tasks, n_jobs)
@@ -0,0 +1,173 @@
+import dataclasses
+import itertools
+import typing
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import friedmanchisquare, wilcoxon
+
+from cacp.comparison import process_comparison, write_comparison, DEFAULT_METRICS
+from cacp.dataset import ClassificationDatasetBase, AVAILABLE_N_FOLDS
+from cacp.journal import ResultJournal
+from cacp.util import to_latex
+
+
+@dataclasses.dataclass
+class Racing:
+    """
+    Racing settings, classifiers are evaluated in steps of folds and after each step classifiers significantly worse
+    than the best one are not evaluated any more.
+
+    :param metric: primary metric name used to compare classifiers (higher is better), None uses first metric
+    :param alpha: significance level of Friedman and Wilcoxon signed-rank tests
+    :param folds_per_step: number of folds of every dataset evaluated in single step
+    :param min_blocks: minimal number of (dataset, fold) results before classifiers can be dropped
+    """
+
+    metric: typing.Optional[str] = None
+    alpha: float = 0.05
+    folds_per_step: int = 1
+    min_blocks: int = 5
+
+
+@dataclasses.dataclass
+class RacingElimination:
+    algorithm: str
+    step: int
+    blocks: int
+    p_value: float
+
+
+def race_step(df: pd.DataFrame, metric: str, alpha: float, min_blocks: int) -> typing.Dict[str, float]:
+    """
+    Finds classifiers significantly worse than the best one on results gathered so far. Friedman test is used to
+    check if there are any differences between classifiers, then every classifier is compared with the best one
+    using the Wilcoxon signed-rank test.
+
+    :param df: comparison results of classifiers still in race
+    :param metric: primary metric
+    :param alpha: significance level
+    :param min_blocks: minimal number of complete (dataset, fold) results required to run tests
+    :return: dictionary of eliminated classifiers and their p-values
+    """
+    blocks = df.pivot_table(index=['Dataset', 'CV index'], columns='Algorithm', values=metric).dropna()
+    if len(blocks) < min_blocks or len(blocks.columns) < 2:
+        return {}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter(action='ignore', category=UserWarning)
+        if len(blocks.columns) > 2:
+            _, p = friedmanchisquare(*[blocks[c].values for c in blocks.columns])
+            if not p < alpha:
+                return {}
+
+        means = blocks.mean()
+        best = means.idxmax()
+        eliminated = {}
+        for algorithm in blocks.columns:
+            if algorithm == best:
+                continue
+            diff = blocks[best].values - blocks[algorithm].values
+            if np.all(diff == 0):
+                continue
+            _, p = wilcoxon(blocks[best].values, blocks[algorithm].values)
+            if p < alpha:
+                eliminated[algorithm] = p
+    return eliminated
+
+
+def process_racing_comparison(
+    racing: Racing,
+    datasets: typing.List[ClassificationDatasetBase],
+    classifiers: typing.List[typing.Tuple[str, typing.Callable]],
+    result_dir: Path,
+    metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+    n_folds: AVAILABLE_N_FOLDS = 10,
+    resume: bool = False,
+    **comparison_kwargs
+) -> typing.List[RacingElimination]:
+    """
+    Runs comparison in racing mode, after each step of folds classifiers significantly worse than the best one
+    are dropped from further evaluation.
+
+    :param racing: racing settings
+    :param datasets: dataset collection
+    :param classifiers: classifiers collection
+    :param result_dir: results directory
+    :param metrics: metrics collection
+    :param n_folds: number of folds {5,10}
+    :param resume: if tasks already stored in results journal should be skipped
+    :param comparison_kwargs: other process_comparison arguments
+    :return: list of eliminated classifiers
+    """
+    metric = racing.metric or metrics[0][0]
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    dataset_names = [dataset.name for dataset in datasets]
+    classifier_names = [c_n for c_n, _ in classifiers]
+
+    racing_classifiers = list(classifiers)
+    eliminations = []
+    fold_indexes = list(range(1, n_folds + 1))
+    steps = [fold_indexes[i:i + racing.folds_per_step] for i in range(0, n_folds, racing.folds_per_step)]
+    for step, step_folds in enumerate(steps, start=1):
+        process_comparison(datasets, racing_classifiers, result_dir, metrics, n_folds=n_folds, folds=step_folds,
+                           resume=resume or step > 1, **comparison_kwargs)
+        if step == len(steps) or len(racing_classifiers) < 2:
+            continue
+
+        df = journal.to_frame()
+        racing_names = [c_n for c_n, _ in racing_classifiers]
+        df = df[df['Dataset'].isin(dataset_names) & df['Algorithm'].isin(racing_names)
+                & df['CV index'].isin(fold_indexes[:step * racing.folds_per_step])]
+        eliminated = race_step(df, metric, racing.alpha, racing.min_blocks)
+        if eliminated:
+            blocks = len(df.drop_duplicates(['Dataset', 'CV index']))
+            for c_n, p in eliminated.items():
+                print(f'Racing: {c_n} is significantly worse on {metric} (p-value {p:.4f}) and is eliminated')
+                eliminations.append(RacingElimination(c_n, step, blocks, p))
+            racing_classifiers = [(c_n, c) for c_n, c in racing_classifiers if c_n not in eliminated]
+
+    # comparison results contain all classifiers, including results of eliminated ones gathered before elimination
+    write_comparison(journal, result_dir, itertools.product(dataset_names, classifier_names, range(1, n_folds + 1)))
+    process_racing_results(eliminations, classifier_names, n_folds * len(datasets), result_dir, metric)
+    return eliminations
+
+
+def process_racing_results(eliminations: typing.List[RacingElimination], classifier_names: typing.List[str],
+                           n_blocks: int, result_dir: Path, metric: str):
+    """
+    Writes racing report with status of every classifier.
+
+    :param eliminations: eliminated classifiers
+    :param classifier_names: names of all classifiers
+    :param n_blocks: number of (dataset, fold) results of classifier that finished race
+    :param result_dir: results directory
+    :param metric: primary metric
+
+    """
+    racing_dir = result_dir.joinpath('racing')
+    racing_dir.mkdir(exist_ok=True, parents=True)
+    eliminated = {e.algorithm: e for e in eliminations}
+    records = []
+    for c_n in classifier_names:
+        e = eliminated.get(c_n)
+        records.append({
+            'Algorithm': c_n,
+            'Status': 'eliminated' if e else 'finished',
+            'Step': e.step if e else None,
+            'Evaluated folds': e.blocks if e else n_blocks,
+            'p-value': e.p_value if e else None,
+        })
+    df = pd.DataFrame(records)
+    df['Step'] = df['Step'].astype('Int64')
+    df.index += 1
+    df.to_csv(racing_dir.joinpath('racing.csv'), index=True)
+    racing_dir.joinpath('racing.tex').open('w').write(
+        to_latex(
+            df.astype(object).where(df.notna(), '-'),
+            caption=f'Racing of classifiers using Friedman and Wilcoxon signed-rank tests for {metric}',
+            label='tab:racing',
+        )
+    )
@@ -7,15 +7,30 @@ from cacp.comparison import DEFAULT_METRICS
 from cacp.util import to_latex
 
 
+def comparison_results(result_dir: Path, df: typing.Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Returns comparison results, so they can be loaded once and shared by all reports.
+
+    :param result_dir: results directory
+    :param df: already loaded comparison results, None reads them from results directory
+    :return: comparison results DataFrame
+    """
+    if df is None:
+        df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    return df
+
+
 def process_comparison_results(result_dir: Path,
-                               metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS):
+                               metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+                               df: typing.Optional[pd.DataFrame] = None):
     """
     Processes comparison results, computes mean values for all metrics.
 
     :param result_dir: results directory
     :param metrics: metrics collection
+    :param df: already loaded comparison results, None reads them from results directory
     """
-    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    df = comparison_results(result_dir, df)
 
     gb = ['Algorithm']
     dfg = df.groupby(gb)
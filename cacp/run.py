@@ -2,14 +2,22 @@ import os
 import typing
 from pathlib import Path
 
+import pandas as pd
 import river.datasets.base
+from joblib import Parallel, delayed
 
+from cacp.cache import TaskCache
 from cacp.comparison import DEFAULT_METRICS, DEFAULT_INCREMENTAL_METRICS
-from cacp.comparison import process_comparison, process_incremental_comparison
+from cacp.comparison import process_comparison, process_incremental_comparison, recompute_comparison
 from cacp.dataset import AVAILABLE_N_FOLDS, ClassificationDatasetBase, ClassificationFoldDataModifierBase
 from cacp.info import dataset_info, classifier_info
-from cacp.plot import process_comparison_results_plots, process_comparison_results_incremental_plots
-from cacp.result import process_comparison_results
+from cacp.limit import LIMIT
+from cacp.plot import DEFAULT_PLOT_FORMATS, DEFAULT_PLOT_POINTS, process_comparison_results_plots, \
+    process_comparison_results_incremental_plots
+from cacp.curve import CurveRecording
+from cacp.halving import SuccessiveHalving, process_halving_comparison
+from cacp.racing import Racing, process_racing_comparison
+from cacp.result import comparison_results, process_comparison_results
 from cacp.time import process_times
 from cacp.util import seed_everything
 from cacp.wilcoxon import process_wilcoxon
@@ -27,7 +35,19 @@ def run_experiment(
     categorical_to_numerical=True,
     normalized: bool = False,
     seed: int = 1,
-    progress=lambda progress, total: None
+    progress=lambda progress, total: None,
+    n_jobs: typing.Optional[int] = None,
+    resume: bool = False,
+    prefetch_depth: int = 2,
+    time_limit: LIMIT = None,
+    memory_limit: LIMIT = None,
+    save_predictions: bool = False,
+    task_cache: typing.Optional[TaskCache] = None,
+    longest_first: bool = True,
+    threads_per_job: typing.Optional[int] = None,
+    racing: typing.Optional[Racing] = None,
+    halving: typing.Optional[SuccessiveHalving] = None,
+    plot_formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS,
 ):
     """
     [Main CACP Function] Runs automatic comparison of the performance evaluation of supervised classification
@@ -44,27 +64,102 @@ def run_experiment(
     :param normalized: if the data should be normalized in range [0..1]
     :param seed: random seed value
     :param progress: function that can be used to monitor progress
+    :param n_jobs: number of parallel workers, None uses all cores
+    :param resume: if tasks finished by previous, interrupted run in the same results directory should be skipped
+    :param prefetch_depth: number of folds loaded and modified in background ahead of running tasks
+    :param time_limit: wall-clock time limit of single task in seconds, for all or per classifier name,
+                       tasks that exceed it are stopped and reported with TIMEOUT status
+    :param memory_limit: memory limit of single task in megabytes, for all or per classifier name,
+                         tasks that exceed it are stopped and reported with OOM status
+    :param save_predictions: if predictions of every task should be stored, so metrics can be recomputed later
+                             with recompute_metrics without training classifiers again
+    :param task_cache: cache of tasks shared between experiments, classifiers with the same parameters are not trained
+                       again on the same fold data with the same seed
+    :param longest_first: if tasks estimated to be the slowest (from timings of previous run in results directory
+                          or datasets sizes) should be started first
+    :param threads_per_job: number of native threads (BLAS, OpenMP) of each worker, None divides all cores between
+                            workers, when n_jobs is None number of workers is derived from it
+    :param racing: racing settings, if set folds are evaluated in steps and classifiers significantly worse than
+                   the best one are dropped early, eliminated classifiers are reported in racing directory
+    :param halving: successive halving settings, if set classifiers are evaluated on growing number of folds and only
+                    the best ones are evaluated on all folds, e.g. variants of ClassifierGrid, rungs reached by
+                    classifiers are reported in halving directory
+    :param plot_formats: plot files formats (eg. png, svg, eps), empty collection disables plots
     """
+    if racing is not None and halving is not None:
+        raise ValueError('racing and halving can not be used together')
     seed_everything(seed)
     result_dir = Path(results_directory)
     result_dir.mkdir(exist_ok=True, parents=True)
 
     dataset_info(datasets, result_dir)
     classifier_info(classifiers, result_dir)
-    process_comparison(
-        datasets, classifiers, result_dir, metrics,
-        n_folds=n_folds,
+    comparison_kwargs = dict(
         dob_scv=dob_scv,
         categorical_to_numerical=categorical_to_numerical,
         normalized=normalized,
         custom_fold_modifiers=custom_fold_modifiers,
-        progress=progress
+        progress=progress,
+        n_jobs=n_jobs,
+        prefetch_depth=prefetch_depth,
+        time_limit=time_limit,
+        memory_limit=memory_limit,
+        save_predictions=save_predictions,
+        task_cache=task_cache,
+        seed=seed,
+        longest_first=longest_first,
+        threads_per_job=threads_per_job,
     )
-    process_comparison_results(result_dir, metrics)
-    process_comparison_results_plots(result_dir, metrics)
-    process_comparison_result_winners(result_dir, metrics)
-    process_times(result_dir)
-    process_wilcoxon(classifiers, result_dir, metrics)
+    if racing is not None:
+        process_racing_comparison(racing, datasets, classifiers, result_dir, metrics, n_folds=n_folds, resume=resume,
+                                  **comparison_kwargs)
+    elif halving is not None:
+        process_halving_comparison(halving, datasets, classifiers, result_dir, metrics, n_folds=n_folds,
+                                   resume=resume, **comparison_kwargs)
+    else:
+        process_comparison(datasets, classifiers, result_dir, metrics, n_folds=n_folds, resume=resume,
+                           **comparison_kwargs)
+    _process_reports(classifiers, result_dir, metrics, plot_formats, n_jobs)
+
+
+def recompute_metrics(
+    results_directory: typing.Union[str, os.PathLike],
+    metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+):
+    """
+    Recomputes metrics of experiment run with save_predictions enabled from stored predictions and rebuilds
+    comparison results and all reports, classifiers are not trained again.
+
+    :param results_directory: results directory of experiment
+    :param metrics: metrics collection
+
+    """
+    result_dir = Path(results_directory)
+    recompute_comparison(result_dir, metrics)
+    algorithms = pd.read_csv(result_dir.joinpath('comparison.csv'))['Algorithm'].unique()
+    _process_reports([(algorithm, None) for algorithm in algorithms], result_dir, metrics)
+
+
+def _process_reports(classifiers: typing.List[typing.Tuple[str, typing.Callable]], result_dir: Path,
+                     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]],
+                     plot_formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS, n_jobs: typing.Optional[int] = None,
+                     incremental: bool = False, plot_points: typing.Optional[int] = DEFAULT_PLOT_POINTS):
+    # comparison results are read once and shared, reports are independent, so they are built concurrently,
+    # every report gets its own copy of results, so pandas objects are not shared between threads
+    df = comparison_results(result_dir)
+    # Wilcoxon report changes process-wide warnings filters (warnings.catch_warnings is not thread-safe),
+    # so it is built before other reports
+    process_wilcoxon(classifiers, result_dir, metrics, df=df.copy())
+    tasks = [
+        delayed(process_comparison_results)(result_dir, metrics, df=df.copy()),
+        delayed(process_comparison_results_plots)(result_dir, metrics, plot_formats, n_jobs, df=df.copy()),
+        delayed(process_comparison_result_winners)(result_dir, metrics, df=df.copy()),
+        delayed(process_times)(result_dir, df=df.copy()),
+    ]
+    if incremental:
+        tasks.append(delayed(process_comparison_results_incremental_plots)(result_dir, metrics, plot_formats, n_jobs,
+                                                                           n_points=plot_points))
+    Parallel(n_jobs=len(tasks), backend='threading')(tasks)
 
 
 def run_incremental_experiment(
@@ -74,6 +169,16 @@ def run_incremental_experiment(
     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_INCREMENTAL_METRICS,
     seed: int = 1,
     progress=lambda progress, total: None,
+    resume: bool = False,
+    time_limit: LIMIT = None,
+    memory_limit: LIMIT = None,
+    n_jobs: typing.Optional[int] = None,
+    threads_per_job: typing.Optional[int] = None,
+    shared_stream: bool = False,
+    batch_size: typing.Optional[int] = None,
+    recording: typing.Optional[CurveRecording] = None,
+    plot_formats: typing.Sequence[str] = DEFAULT_PLOT_FORMATS,
+    plot_points: typing.Optional[int] = DEFAULT_PLOT_POINTS,
 ):
     """
     [Main CACP Function] Runs automatic comparison of the performance evaluation of supervised classification
@@ -85,6 +190,23 @@ def run_incremental_experiment(
     :param metrics: metrics collection
     :param seed: random seed value
     :param progress: function that can be used to monitor progress
+    :param resume: if tasks finished by previous, interrupted run in the same results directory should be skipped
+    :param time_limit: wall-clock time limit of single classifier on single dataset in seconds,
+                       for all or per classifier name, tasks that exceed it are stopped and reported with TIMEOUT status
+    :param memory_limit: memory limit of single classifier on single dataset in megabytes,
+                         for all or per classifier name, tasks that exceed it are stopped and reported with OOM status
+    :param n_jobs: number of classifiers processed in parallel on each dataset, None uses all cores
+    :param threads_per_job: number of native threads (BLAS, OpenMP) of each worker, None divides all cores between
+                            workers, when n_jobs is None number of workers is derived from it
+    :param shared_stream: if every worker should stream dataset once and feed each sample to all its classifiers
+                          instead of streaming dataset separately for every classifier, time and memory limits
+                          then apply to whole group of classifiers of worker
+    :param batch_size: number of samples predicted and then learned at once by classifiers with learn_many and
+                       predict_many methods (eg. river mini-batch classifiers), None evaluates sample by sample
+    :param recording: learning curves recording settings (recording interval or log-spaced checkpoints and file
+                      format), None records every sample in csv file
+    :param plot_formats: plot files formats (eg. png, svg, eps), empty collection disables plots
+    :param plot_points: number of points learning curves are downsampled to before plotting, None plots all points
 
     """
     seed_everything(seed)
@@ -94,12 +216,15 @@ def run_incremental_experiment(
     dataset_info(datasets, result_dir)
     classifier_info(classifiers, result_dir)
     process_incremental_comparison(
-        datasets, classifiers, result_dir, metrics, progress
+        datasets, classifiers, result_dir, metrics, progress,
+        resume=resume,
+        time_limit=time_limit,
+        memory_limit=memory_limit,
+        n_jobs=n_jobs,
+        threads_per_job=threads_per_job,
+        shared_stream=shared_stream,
+        batch_size=batch_size,
+        recording=recording,
     )
 
-    process_comparison_results(result_dir, metrics)
-    process_comparison_results_plots(result_dir, metrics)
-    process_comparison_results_incremental_plots(result_dir, metrics)
-    process_comparison_result_winners(result_dir, metrics)
-    process_times(result_dir)
-    process_wilcoxon(classifiers, result_dir, metrics)
+    _process_reports(classifiers, result_dir, metrics, plot_formats, n_jobs, incremental=True, plot_points=plot_points)
@@ -0,0 +1,97 @@
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cacp.dataset import ClassificationDatasetMinimalBase
+
+TIME_COLUMNS = ('Train time [s]', 'Prediction time [s]')
+
+
+def default_cost_history(result_dir: Path) -> typing.List[Path]:
+    """
+    Gets timing files of previous run stored in results directory.
+
+    :param result_dir: results directory
+    :return: list of existing comparison and time comparison files
+    """
+    paths = [result_dir.joinpath('comparison.csv'), result_dir.joinpath('time', 'comparison.csv')]
+    return [p for p in paths if p.exists()]
+
+
+def dataset_size(dataset: ClassificationDatasetMinimalBase) -> typing.Optional[float]:
+    """
+    Gets size of dataset used as cost heuristic (instances x features).
+
+    :param dataset: dataset
+    :return: dataset size or None if dataset does not provide metadata
+    """
+    try:
+        return float(dataset.instances * dataset.features)
+    except Exception:
+        return None
+
+
+class TaskCostEstimator:
+    """
+    Estimates cost of comparison tasks from timings of previous runs, tasks without timings are estimated from
+    classifier average time scaled by dataset size or from dataset size alone.
+    """
+
+    def __init__(self, history: typing.Iterable[typing.Union[Path, pd.DataFrame]] = ()):
+        """
+        Initializes task cost estimator.
+
+        :param history: previous comparison.csv or time/comparison.csv files (or their data frames)
+        """
+        self._task_costs = {}
+        self._algorithm_costs = {}
+        for source in history:
+            try:
+                df = source if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+            except (OSError, ValueError):
+                continue
+            self.add(df)
+
+    def add(self, df: pd.DataFrame):
+        """
+        Adds timings to estimator, data frame has to contain Algorithm column and time columns,
+        Dataset column is optional.
+
+        :param df: data frame with timings
+        """
+        if 'Algorithm' not in df.columns or not all(c in df.columns for c in TIME_COLUMNS):
+            return
+        df = df.assign(cost=df[list(TIME_COLUMNS)].sum(axis=1, min_count=1)).dropna(subset=['cost'])
+        if 'Dataset' in df.columns:
+            for (dataset_name, algorithm), cost in df.groupby(['Dataset', 'Algorithm'])['cost'].mean().items():
+                self._task_costs[(dataset_name, algorithm)] = cost
+        for algorithm, cost in df.groupby('Algorithm')['cost'].mean().items():
+            self._algorithm_costs.setdefault(algorithm, cost)
+
+    def costs(self, datasets: typing.Sequence[ClassificationDatasetMinimalBase],
+              classifier_names: typing.Sequence[str]) -> typing.Dict[typing.Tuple[str, str], float]:
+        """
+        Estimates cost of single fold task for every dataset and classifier.
+
+        :param datasets: dataset collection
+        :param classifier_names: classifiers names
+        :return: dictionary of estimated costs by dataset and classifier names
+        """
+        sizes = {dataset.name: dataset_size(dataset) for dataset in datasets}
+        known_sizes = [s for s in sizes.values() if s]
+        mean_size = float(np.mean(known_sizes)) if known_sizes else 1.
+        known_costs = list(self._task_costs.values()) or list(self._algorithm_costs.values())
+        # converts dataset size to seconds, so estimates from heuristic are comparable with historical ones
+        mean_cost = float(np.mean(known_costs)) if known_costs else 1.
+
+        costs = {}
+        for dataset in datasets:
+            relative_size = (sizes[dataset.name] or mean_size) / mean_size
+            for classifier_name in classifier_names:
+                cost = self._task_costs.get((dataset.name, classifier_name))
+                if cost is None:
+                    cost = self._algorithm_costs.get(classifier_name, mean_cost) * relative_size
+                costs[(dataset.name, classifier_name)] = cost
+        return costs
@@ -0,0 +1,106 @@
+import os
+import pickle
+import sys
+import typing
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+CPU_USER_TIME = 'CPU user time [s]'
+CPU_SYSTEM_TIME = 'CPU system time [s]'
+PEAK_MEMORY = 'Peak memory [MB]'
+MODEL_SIZE = 'Model size [MB]'
+
+TELEMETRY_COLUMNS = (CPU_USER_TIME, CPU_SYSTEM_TIME, PEAK_MEMORY, MODEL_SIZE)
+
+_PROC_SELF = Path('/proc/self')
+
+
+def _reset_peak_memory() -> bool:
+    # since Linux 4.0 writing 5 to clear_refs resets peak resident set size of process
+    try:
+        _PROC_SELF.joinpath('clear_refs').write_text('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_memory_mb() -> float:
+    try:
+        with _PROC_SELF.joinpath('status').open() as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, other systems kilobytes
+        return max_rss / 1024 / 1024 if sys.platform == 'darwin' else max_rss / 1024
+    return np.nan
+
+
+def _cpu_times() -> typing.Tuple[float, float]:
+    if resource is not None:
+        # microsecond resolution, os.times is limited to clock ticks on some systems,
+        # on Linux only current thread is measured, so other threads of process (eg. folds prefetch) are not counted
+        usage = resource.getrusage(getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF))
+        return usage.ru_utime, usage.ru_stime
+    times = os.times()
+    return times.user, times.system
+
+
+def model_size_mb(model) -> float:
+    """
+    Calculates size of serialized model.
+
+    :param model: trained model
+    :return: size of pickled model in megabytes or NaN if model can't be pickled
+    """
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 / 1024
+    except Exception:
+        return np.nan
+
+
+class ResourceMonitor:
+    """
+    Measures CPU time and peak resident memory while code in its context is running.
+    On Linux CPU time is measured for current thread only (native threads started by code, eg. BLAS or OpenMP
+    workers, are not included), on other systems for whole process.
+    Peak memory is increase of peak resident memory of process over resident memory when context was entered,
+    so memory of interpreter and data loaded before is not included. On systems where peak can't be reset,
+    it is increase over previous peak of process, so it can be lower than real usage.
+    """
+
+    def __init__(self):
+        self.cpu_user_time = np.nan
+        self.cpu_system_time = np.nan
+        self.peak_memory = np.nan
+        self._start = None
+        self._start_memory = np.nan
+
+    def __enter__(self):
+        # after reset peak is equal to current resident memory
+        _reset_peak_memory()
+        self._start_memory = _peak_memory_mb()
+        self._start = _cpu_times()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        user, system = _cpu_times()
+        self.cpu_user_time = user - self._start[0]
+        self.cpu_system_time = system - self._start[1]
+        self.peak_memory = max(_peak_memory_mb() - self._start_memory, 0.)
+
+    def columns(self) -> typing.Dict[str, float]:
+        return {
+            CPU_USER_TIME: self.cpu_user_time,
+            CPU_SYSTEM_TIME: self.cpu_system_time,
+            PEAK_MEMORY: self.peak_memory,
+        }
@@ -1,26 +1,32 @@
+import typing
 from pathlib import Path
 
 import pandas as pd
 
+from cacp.result import comparison_results
+from cacp.telemetry import TELEMETRY_COLUMNS
 from cacp.util import to_latex
 
 
-def process_times(result_dir: Path):
+def process_times(result_dir: Path, df: typing.Optional[pd.DataFrame] = None):
     """
     Processes comparison results times.
 
     :param result_dir: results directory
+    :param df: already loaded comparison results, None reads them from results directory
 
     """
-    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    df = comparison_results(result_dir, df)
     time_dir = result_dir.joinpath('time')
     time_dir.mkdir(exist_ok=True, parents=True)
     gb = ['Algorithm']
     dfg = df.groupby(gb)
     df = dfg.mean(numeric_only=True)
-    columns = ['Train time [s]', 'Prediction time [s]']
+    time_columns = ['Train time [s]', 'Prediction time [s]']
+    # threads budget and resource usage are reported only for results that contain them
+    columns = time_columns + [c for c in ('Threads',) + TELEMETRY_COLUMNS if c in df.columns]
     df_csv = df[columns]
-    df_csv = df_csv.sort_values(by=columns, ascending=True)
+    df_csv = df_csv.sort_values(by=time_columns, ascending=True)
     df_csv.to_csv(time_dir.joinpath('comparison.csv'))
 
     df_tex = df_csv.copy(deep=True)
@@ -1,4 +1,6 @@
+import functools
 import random
+import typing
 
 import numpy as np
 import pandas as pd
@@ -60,27 +62,146 @@ def to_latex(df: pd.DataFrame, **kwargs) -> str:
     return '\n'.join(lines)
 
 
-def accuracy(y_true, y_pred, labels):
-    return accuracy_score(y_true, y_pred)
-
-
-def precision(y_true, y_pred, labels):
-    return precision_score(y_true, y_pred, average='weighted', labels=labels,
-                           zero_division=0)
-
-
-def recall(y_true, y_pred, labels):
-    return recall_score(y_true, y_pred, average='weighted', labels=labels,
-                        zero_division=0)
-
-
-def f1(y_true, y_pred, labels):
-    return f1_score(y_true, y_pred, average='weighted', labels=labels, zero_division=0)
+class MetricContext:
+    """
+    Label encoding and confusion matrix of single prediction, computed once and shared by all metrics of a task.
+    """
 
+    def __init__(self, y_true: np.ndarray, y_pred: np.ndarray, labels: np.ndarray):
+        """
+        Initializes metric context.
+
+        :param y_true: real labels
+        :param y_pred: predicted labels
+        :param labels: all dataset labels
+        """
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self.labels = labels
+        self.labels_sorted = False
+        self.classes = None
+        self.confusion_matrix = None
+        try:
+            labels = np.asarray(labels)
+            self.classes = np.sort(labels)
+            self.labels_sorted = bool(np.array_equal(self.classes, labels))
+            true_encoded = self._encode(np.asarray(y_true))
+            pred_encoded = self._encode(np.asarray(y_pred))
+        except (TypeError, ValueError):
+            return
+        n_classes = len(self.classes)
+        if true_encoded is not None and pred_encoded is not None and len(true_encoded) > 0:
+            self.confusion_matrix = np.bincount(
+                true_encoded * n_classes + pred_encoded, minlength=n_classes * n_classes
+            ).reshape(n_classes, n_classes)
+
+    def _encode(self, values: np.ndarray) -> typing.Optional[np.ndarray]:
+        if values.ndim != 1 or len(self.classes) == 0:
+            return None
+        encoded = np.minimum(np.searchsorted(self.classes, values), len(self.classes) - 1)
+        if not np.all(self.classes[encoded] == values):
+            # values outside of dataset labels, metrics have to be computed in regular way
+            return None
+        return encoded
+
+    @property
+    def support(self) -> np.ndarray:
+        return self.confusion_matrix.sum(axis=1)
+
+    @property
+    def true_positives(self) -> np.ndarray:
+        return np.diag(self.confusion_matrix)
+
+
+def context_metric(fun: typing.Callable[[MetricContext], float]) -> typing.Callable:
+    """
+    Creates metric from function that uses precomputed metric context, created metric can still be called with
+    (y_true, y_pred, labels) and exposes original function as from_context attribute.
 
-def auc(y_true, y_pred, labels):
-    return auc_score(y_true, y_pred, average='weighted', multi_class='ovo', labels=labels)
+    :param fun: function that calculates metric value from metric context
+    :return: metric function
 
+    """
 
-def matthews_corrcoef(y_true, y_pred, labels):
-    return sk_matthews_corrcoef(y_true, y_pred)
+    @functools.wraps(fun)
+    def metric(y_true, y_pred, labels):
+        return fun(MetricContext(y_true, y_pred, labels))
+
+    metric.from_context = fun
+    return metric
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    result = np.zeros(len(numerator), dtype=float)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def _weighted(context: MetricContext, values: np.ndarray) -> float:
+    return float(np.average(values, weights=context.support))
+
+
+@context_metric
+def accuracy(context: MetricContext) -> float:
+    if context.confusion_matrix is None:
+        return accuracy_score(context.y_true, context.y_pred)
+    return float(context.true_positives.sum() / context.confusion_matrix.sum())
+
+
+@context_metric
+def precision(context: MetricContext) -> float:
+    if context.confusion_matrix is None:
+        return precision_score(context.y_true, context.y_pred, average='weighted', labels=context.labels,
+                               zero_division=0)
+    return _weighted(context, _safe_divide(context.true_positives, context.confusion_matrix.sum(axis=0)))
+
+
+@context_metric
+def recall(context: MetricContext) -> float:
+    if context.confusion_matrix is None:
+        return recall_score(context.y_true, context.y_pred, average='weighted', labels=context.labels,
+                            zero_division=0)
+    return _weighted(context, _safe_divide(context.true_positives, context.support))
+
+
+@context_metric
+def f1(context: MetricContext) -> float:
+    if context.confusion_matrix is None:
+        return f1_score(context.y_true, context.y_pred, average='weighted', labels=context.labels, zero_division=0)
+    tp = context.true_positives
+    return _weighted(context, _safe_divide(2 * tp, context.confusion_matrix.sum(axis=0) + context.support))
+
+
+@context_metric
+def auc(context: MetricContext) -> float:
+    cm = context.confusion_matrix
+    n_classes = 0 if context.classes is None else len(context.classes)
+    # binarized predictions give single point ROC curve, so AUC of every class pair is (1 + TPR - FPR) / 2
+    if cm is None or n_classes < 2 or not np.all(context.support > 0) or \
+            (n_classes > 2 and not context.labels_sorted):
+        return auc_score(context.y_true, context.y_pred, average='weighted', multi_class='ovo', labels=context.labels)
+    rates = cm / context.support[:, None]
+    if n_classes == 2:
+        return float((1 + rates[1, 1] - rates[0, 1]) / 2)
+    a, b = np.triu_indices(n_classes, k=1)
+    a_score = (1 + rates[a, a] - rates[b, a]) / 2
+    b_score = (1 + rates[b, b] - rates[a, b]) / 2
+    support = context.support
+    return float(np.average((a_score + b_score) / 2, weights=support[a] + support[b]))
+
+
+@context_metric
+def matthews_corrcoef(context: MetricContext) -> float:
+    cm = context.confusion_matrix
+    if cm is None:
+        return sk_matthews_corrcoef(context.y_true, context.y_pred)
+    t_sum = cm.sum(axis=1, dtype=np.float64)
+    p_sum = cm.sum(axis=0, dtype=np.float64)
+    n_correct = np.trace(cm, dtype=np.float64)
+    n_samples = p_sum.sum()
+    cov_ytyp = n_correct * n_samples - np.dot(t_sum, p_sum)
+    cov_ypyp = n_samples ** 2 - np.dot(p_sum, p_sum)
+    cov_ytyt = n_samples ** 2 - np.dot(t_sum, t_sum)
+    if cov_ypyp * cov_ytyt == 0:
+        return 0.0
+    return float(cov_ytyp / np.sqrt(cov_ytyt * cov_ypyp))
@@ -1,3 +1,4 @@
+import itertools
 import typing
 import warnings
 from pathlib import Path
@@ -7,6 +8,7 @@ import pandas as pd
 from scipy.stats import wilcoxon
 
 from cacp.comparison import DEFAULT_METRICS
+from cacp.result import comparison_results
 from cacp.util import to_latex
 
 
@@ -25,13 +27,72 @@ def bold_large_p_value(data: float, format_string="%.4f") -> str:
     return "%s" % format_string % data
 
 
-def process_wilcoxon_for_metric(current_algorithm: str, metric: str, result_dir: Path) -> pd.DataFrame:
+def wilcoxon_matrix(df: pd.DataFrame, metric: str) -> pd.DataFrame:
+    """
+    Calculates the Wilcoxon signed-rank test of every pair of algorithms for comparison results single metric.
+    Results are pivoted once to (dataset, fold) x algorithm table, so values of algorithms are paired by dataset
+    and fold. Every pair is tested in both orders, as scipy handling of zero and tied differences can make p-value
+    depend on order of algorithms.
+
+    :param df: comparison results
+    :param metric: comparison metric {auc, accuracy, precision, recall, f1}
+    :return: DataFrame with p-values of every pair of algorithms, algorithm in row is the first sample of test
+
+    """
+    algorithms = list(df['Algorithm'].unique())
+    keys = [c for c in ('Dataset', 'CV index') if c in df.columns]
+    values = df.pivot(index=keys, columns='Algorithm', values=metric)[algorithms].to_numpy(dtype=float)
+    # classifiers with missing results (eg. eliminated in racing) are compared only on results available for both
+    available = df.assign(available=True).pivot(index=keys, columns='Algorithm', values='available')[algorithms]
+    available = available.notna().to_numpy()
+
+    matrix = np.full((len(algorithms), len(algorithms)), np.nan)
+    # scipy vectorized test selects single method (exact or approximate) for all pairs, so pairs are tested separately
+    for i, j in itertools.permutations(range(len(algorithms)), 2):
+        paired = available[:, i] & available[:, j]
+        alg1_values, alg2_values = values[paired, i], values[paired, j]
+        if np.all(alg1_values - alg2_values == 0):
+            p = 1
+        else:
+            _, p = wilcoxon(alg1_values, alg2_values)
+        matrix[i, j] = p
+    return pd.DataFrame(matrix, index=pd.Index(algorithms, name='Algorithm'), columns=algorithms)
+
+
+def process_wilcoxon_matrix(metric: str, matrix: pd.DataFrame, result_dir: Path):
+    """
+    Writes p-values matrix of the Wilcoxon signed-rank test of every pair of algorithms for single metric.
+
+    :param metric: comparison metric {auc, accuracy, precision, recall, f1}
+    :param matrix: p-values matrix
+    :param result_dir: results directory
+
+    """
+    metric_dir = result_dir.joinpath('wilcoxon').joinpath(metric.lower())
+    metric_dir.mkdir(exist_ok=True, parents=True)
+    matrix.to_csv(metric_dir.joinpath('matrix.csv'), index=True)
+    df_tex = matrix.apply(lambda column: column.apply(lambda data: '-' if np.isnan(data) else bold_large_p_value(data)))
+    df_tex.reset_index(inplace=True)
+    df_tex.index += 1
+    metric_dir.joinpath('matrix.tex').open('w').write(
+        to_latex(df_tex,
+                 caption=f"Comparison of classifiers using Wilcoxon signed-rank test for {metric}",
+                 label=f'tab:wilcoxon_{metric}_matrix',
+                 )
+    )
+
+
+def process_wilcoxon_for_metric(current_algorithm: str, metric: str, result_dir: Path,
+                                df: typing.Optional[pd.DataFrame] = None,
+                                matrix: typing.Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
     Calculates the Wilcoxon signed-rank test for comparison results single metric.
 
     :param current_algorithm: current algorithm
     :param metric: comparison metric {auc, accuracy, precision, recall, f1}
     :param result_dir: results directory
+    :param df: already loaded comparison results, None reads them from results directory
+    :param matrix: already calculated p-values matrix of metric, None calculates it from comparison results
     :return: DateFrame with wilcoxon values for metric
 
     """
@@ -40,24 +101,16 @@ def process_wilcoxon_for_metric(current_algorithm: str, metric: str, result_dir:
     metric_dir = wilcoxon_dir.joinpath(metric.lower())
     metric_dir.mkdir(exist_ok=True, parents=True)
 
-    records = []
-    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
-    algorithms = list(df['Algorithm'].unique())
+    if matrix is None:
+        matrix = wilcoxon_matrix(comparison_results(result_dir, df), metric)
+    algorithms = list(matrix.columns)
     algorithms.remove(current_algorithm)
-    current_alg_df = df[df['Algorithm'] == current_algorithm]
+    records = []
     for algorithm in algorithms:
-        a_df = df[df['Algorithm'] == algorithm]
-        alg1_values = current_alg_df[metric].values
-        alg2_values = a_df[metric].values
-        diff = alg1_values - alg2_values
-        if np.all(diff == 0):
-            w, p = 'invalid-data', 1
-        else:
-            w, p = wilcoxon(alg1_values, alg2_values)
         row = {
             current_algorithm: current_algorithm,
             'Algorithm': algorithm,
-            'p-value': p,
+            'p-value': matrix.loc[current_algorithm, algorithm],
         }
         records.append(row)
 
@@ -77,21 +130,31 @@ def process_wilcoxon_for_metric(current_algorithm: str, metric: str, result_dir:
 
 
 def process_wilcoxon(classifiers: typing.List[typing.Tuple[str, typing.Callable]], result_dir: Path,
-                     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS):
+                     metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+                     df: typing.Optional[pd.DataFrame] = None):
     """
     Calculates the Wilcoxon signed-rank test for comparison results.
 
     :param classifiers: classifiers collection
     :param result_dir: results directory
     :param metrics: metrics collection
+    :param df: already loaded comparison results, None reads them from results directory
 
     """
+    df = comparison_results(result_dir, df)
+    with warnings.catch_warnings():
+        warnings.simplefilter(action='ignore', category=UserWarning)
+        matrices = {metric: wilcoxon_matrix(df, metric) for metric, _ in metrics}
+    for metric, matrix in matrices.items():
+        process_wilcoxon_matrix(metric, matrix, result_dir)
+
     for current_algorithm, _ in classifiers:
         with warnings.catch_warnings():
             warnings.simplefilter(action='ignore', category=UserWarning)
             r_df = None
             for metric, _ in metrics:
-                metric_wilcoxon = process_wilcoxon_for_metric(current_algorithm, metric, result_dir)
+                metric_wilcoxon = process_wilcoxon_for_metric(current_algorithm, metric, result_dir,
+                                                              matrix=matrices[metric])
                 if metric_wilcoxon.empty:
                     continue
                 metric_wilcoxon = metric_wilcoxon.sort_values(by=['Algorithm'])
@@ -4,19 +4,22 @@ from pathlib import Path
 import pandas as pd
 
 from cacp.comparison import DEFAULT_METRICS
+from cacp.result import comparison_results
 from cacp.util import to_latex
 
 
-def process_comparison_result_winners_for_metric(metric: str, result_dir: Path) -> pd.DataFrame:
+def process_comparison_result_winners_for_metric(metric: str, result_dir: Path,
+                                                 df: typing.Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
     Processes comparison results, finds winners for metric.
 
     :param metric: comparison metric {auc, accuracy, precision, recall, f1}
     :param result_dir: results directory
+    :param df: already loaded comparison results, None reads them from results directory
     :return: DateFrame with winners for metric
 
     """
-    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    df = comparison_results(result_dir, df)
     algorithms = df['Algorithm'].unique()
     places = [i for i in range(min(len(algorithms), 3))]
 
@@ -63,17 +66,20 @@ def process_comparison_result_winners_for_metric(metric: str, result_dir: Path)
 
 
 def process_comparison_result_winners(result_dir: Path,
-                                      metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS):
+                                      metrics: typing.Sequence[typing.Tuple[str, typing.Callable]] = DEFAULT_METRICS,
+                                      df: typing.Optional[pd.DataFrame] = None):
     """
     Processes comparison results, finds winners.
 
     :param result_dir: results directory
     :param metrics: metrics collection
+    :param df: already loaded comparison results, None reads them from results directory
 
     """
+    df = comparison_results(result_dir, df)
     wins_df = None
     for metric, _ in metrics:
-        metric_wins = process_comparison_result_winners_for_metric(metric, result_dir).sort_values(by=['Algorithm'])
+        metric_wins = process_comparison_result_winners_for_metric(metric, result_dir, df).sort_values(by=['Algorithm'])
         if wins_df is None:
             wins_df = metric_wins[['Algorithm']].copy()
 
@@ -0,0 +1,40 @@
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from cacp.cache import TaskCache, fold_digest, store_task, load_task
+from cacp.dataset import ClassificationFoldData
+
+
+def _fold(seed: int) -> ClassificationFoldData:
+    rng = np.random.default_rng(seed)
+    return ClassificationFoldData(
+        index=1,
+        x_train=rng.random((20, 3)), y_train=rng.integers(0, 2, 20),
+        x_test=rng.random((5, 3)), y_test=rng.integers(0, 2, 5),
+        labels=np.array([0, 1])
+    )
+
+
+def test_task_cache_key(result_dir):
+    cache = TaskCache(result_dir.joinpath('task_cache'))
+    key = cache.key(DecisionTreeClassifier(max_depth=3), fold_digest(_fold(1)), seed=1)
+    assert key == cache.key(DecisionTreeClassifier(max_depth=3), fold_digest(_fold(1)), seed=1)
+    assert key != cache.key(DecisionTreeClassifier(max_depth=4), fold_digest(_fold(1)), seed=1)
+    assert key != cache.key(DecisionTreeClassifier(max_depth=3), fold_digest(_fold(2)), seed=1)
+    assert key != cache.key(DecisionTreeClassifier(max_depth=3), fold_digest(_fold(1)), seed=2)
+
+
+def test_task_cache_store_and_evict(result_dir):
+    cache = TaskCache(result_dir.joinpath('task_cache'), max_entries=2)
+    cache.clear()
+    paths = [cache.entry(cache.key(DecisionTreeClassifier(max_depth=d), fold_digest(_fold(1)))) for d in range(3)]
+    for path in paths:
+        store_task(path, {'Train time [s]': 1.0}, np.array([0, 1, 1]))
+
+    info, pred, proba, _ = load_task(paths[0])
+    assert info == {'Train time [s]': 1.0}
+    assert pred.tolist() == [0, 1, 1]
+    assert proba is None
+
+    cache.evict()
+    assert len(list(cache.directory.glob('*/*.npz'))) == 2
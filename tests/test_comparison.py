@@ -1,7 +1,18 @@
+import time
+
+import pandas as pd
 import pytest
+from river.naive_bayes import GaussianNB, BernoulliNB
+from river.tree import HoeffdingTreeClassifier
+from sklearn.tree import DecisionTreeClassifier
 
-from cacp.comparison import process_comparison, process_incremental_comparison
-from cacp.util import seed_everything
+from cacp.curve import CurveRecording, curve_files
+from cacp.comparison import process_comparison, process_incremental_comparison, recompute_comparison, \
+    process_comparison_single, DEFAULT_METRICS, DEFAULT_INCREMENTAL_METRICS
+from cacp.journal import ResultJournal
+from cacp.plot import process_comparison_results_incremental_plots
+from cacp.util import seed_everything, matthews_corrcoef
+from cacp_examples.example_custom_datasets.random_dataset import RandomDataset
 
 
 @pytest.mark.parametrize("test_input",
@@ -28,3 +39,162 @@ def test_comparison_incremental(result_dir, incremental_datasets, incremental_cl
         incremental_datasets, incremental_classifiers, result_dir,
     )
     assert result_dir.joinpath('comparison.csv').exists()
+
+
+def test_comparison_n_jobs(result_dir, datasets, classifiers):
+    seed_everything()
+    process_comparison(datasets, classifiers, result_dir, n_folds=5, n_jobs=2)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert len(df) == len(datasets) * 5 * len(classifiers)
+
+
+def test_comparison_resume(result_dir, datasets, classifiers):
+    seed_everything()
+    process_comparison(datasets[:1], classifiers, result_dir, n_folds=5)
+    process_comparison(datasets, classifiers, result_dir, n_folds=5, resume=True)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert len(df) == len(datasets) * 5 * len(classifiers)
+    assert not df.duplicated(['Dataset', 'Algorithm', 'CV index']).any()
+
+
+def test_comparison_resume_settings(result_dir):
+    classifiers = [('DT', lambda n_inputs, n_classes: DecisionTreeClassifier())]
+    process_comparison([RandomDataset()], classifiers, result_dir, n_folds=10)
+    # tasks computed on other folds are not reused and not written to results
+    process_comparison([RandomDataset()], classifiers, result_dir, n_folds=5, resume=True)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert df['CV index'].tolist() == [1, 2, 3, 4, 5]
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    assert len(journal.keys()) == 5
+
+    process_comparison([RandomDataset()], classifiers, result_dir, n_folds=5, folds=[1, 2], resume=True)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert df['CV index'].tolist() == [1, 2]
+
+
+def test_comparison_single_failing_classifier(capsys):
+    dataset = RandomDataset()
+    fold = next(iter(dataset.folds()))
+    row = process_comparison_single(lambda n_inputs, n_classes: DecisionTreeClassifier(max_depth=-1), 'DT', dataset,
+                                    fold, DEFAULT_METRICS)
+    assert row['Status'] == 'ERROR'
+    assert all(row[metric] == 0. for metric, _ in DEFAULT_METRICS)
+    assert capsys.readouterr().out.count('Error while') == 1
+
+
+def test_comparison_recompute(result_dir, datasets, classifiers):
+    seed_everything()
+    process_comparison(datasets[:1], classifiers, result_dir, n_folds=5, save_predictions=True)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    recompute_comparison(result_dir, DEFAULT_METRICS + (('MCC', matthews_corrcoef),))
+    df_recomputed = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert 'MCC' in df_recomputed.columns
+    for metric, _ in DEFAULT_METRICS:
+        assert df_recomputed[metric].values == pytest.approx(df[metric].values)
+
+
+def test_comparison_incremental_shared_stream(result_dir):
+    classifiers = [
+        ('GNB', lambda n_inputs, n_classes: GaussianNB()),
+        ('HAT', lambda n_inputs, n_classes: HoeffdingTreeClassifier()),
+    ]
+    seed_everything(1)
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1)
+    separate = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    seed_everything(1)
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, shared_stream=True)
+    shared = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    metric_names = [m for m, _ in DEFAULT_INCREMENTAL_METRICS]
+    pd.testing.assert_frame_equal(separate[['Algorithm', *metric_names]], shared[['Algorithm', *metric_names]])
+
+
+class FailingGaussianNB(GaussianNB):
+
+    def learn_one(self, x, y, **kwargs):
+        if sum(self.class_counts.values()) >= 20:
+            raise ValueError('learning failed')
+        return super().learn_one(x, y, **kwargs)
+
+
+@pytest.mark.parametrize("shared_stream", [True, False])
+def test_comparison_incremental_failing_classifier(result_dir, shared_stream, capsys):
+    classifiers = [
+        ('GNB', lambda n_inputs, n_classes: GaussianNB()),
+        ('Failing', lambda n_inputs, n_classes: FailingGaussianNB()),
+    ]
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, shared_stream=shared_stream,
+                                   recording=CurveRecording(chunk_size=5))
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert df.set_index('Algorithm')['Status'].to_dict() == {'GNB': 'OK', 'Failing': 'ERROR'}
+    assert capsys.readouterr().out.count('Error while') == 1
+
+    incremental_dir = result_dir.joinpath('incremental')
+    assert not list(incremental_dir.joinpath('result', 'Failing').iterdir())
+    assert [name for name, _ in curve_files(incremental_dir.joinpath('result', 'GNB'))] == ['RandomDataset']
+    process_comparison_results_incremental_plots(result_dir)
+    assert incremental_dir.joinpath('plot', 'RandomDataset_accuracy.png').exists()
+
+
+class SlowGaussianNB(GaussianNB):
+
+    def learn_one(self, x, y, **kwargs):
+        if sum(self.class_counts.values()) >= 20:
+            time.sleep(60)
+        return super().learn_one(x, y, **kwargs)
+
+
+@pytest.mark.parametrize("shared_stream", [True, False])
+def test_comparison_incremental_killed_classifier(result_dir, shared_stream):
+    recording = CurveRecording(chunk_size=5)
+    process_incremental_comparison([RandomDataset()], [('Slow', lambda n_inputs, n_classes: GaussianNB())],
+                                   result_dir, n_jobs=1, shared_stream=shared_stream, recording=recording)
+    slow_dir = result_dir.joinpath('incremental', 'result', 'Slow')
+    assert [name for name, _ in curve_files(slow_dir)] == ['RandomDataset']
+
+    # curve of previous run and partially written curve of killed evaluation are removed
+    process_incremental_comparison([RandomDataset()], [('Slow', lambda n_inputs, n_classes: SlowGaussianNB())],
+                                   result_dir, n_jobs=1, shared_stream=shared_stream, recording=recording,
+                                   time_limit=2)
+    df = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert df['Status'].tolist() == ['TIMEOUT']
+    assert not list(slow_dir.iterdir())
+
+
+def test_comparison_incremental_resume_settings(result_dir):
+    classifiers = [('GNB', lambda n_inputs, n_classes: GaussianNB())]
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1)
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm'])
+    journal.append({'Dataset': 'Other', 'Algorithm': 'GNB'})
+
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, resume=True)
+    assert journal.keys() == {('RandomDataset', 'GNB'), ('Other', 'GNB')}
+    assert pd.read_csv(result_dir.joinpath('comparison.csv'))['Dataset'].tolist() == ['RandomDataset']
+
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, resume=True, batch_size=10)
+    assert journal.keys() == {('RandomDataset', 'GNB')}
+    assert journal.settings()['batch_size'] == 10
+
+
+def test_comparison_incremental_batch_size(result_dir):
+    classifiers = [
+        ('GNB', lambda n_inputs, n_classes: GaussianNB()),
+        ('BNB', lambda n_inputs, n_classes: BernoulliNB()),
+    ]
+    metric_names = [m for m, _ in DEFAULT_INCREMENTAL_METRICS]
+    seed_everything(1)
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1)
+    separate = pd.read_csv(result_dir.joinpath('comparison.csv'))
+
+    seed_everything(1)
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, batch_size=1)
+    batched = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    pd.testing.assert_frame_equal(separate[['Algorithm', *metric_names]], batched[['Algorithm', *metric_names]])
+
+    seed_everything(1)
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir, n_jobs=1, batch_size=10,
+                                   shared_stream=True)
+    batched = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert (batched['Status'] == 'OK').all()
+    # classifiers without batch methods are evaluated sample by sample
+    pd.testing.assert_frame_equal(separate[separate['Algorithm'] == 'GNB'][metric_names],
+                                  batched[batched['Algorithm'] == 'GNB'][metric_names])
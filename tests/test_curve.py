@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from river import metrics as river_metrics
+from river.naive_bayes import GaussianNB
+
+from cacp.comparison import process_incremental_comparison
+from cacp.curve import CurveRecording, PrequentialCurves, curve_files, read_curve, lttb, read_downsampled_curve
+from cacp.plot import process_comparison_results_incremental_plots
+from cacp_examples.example_custom_datasets.random_dataset import RandomDataset
+
+
+@pytest.mark.parametrize("curve_format", ['csv', 'csv.gz', 'npz'])
+def test_curve_recorder(result_dir, curve_format):
+    recorder = CurveRecording(interval=3, format=curve_format, chunk_size=2).recorder(result_dir.joinpath('curve'))
+    rows = [{'index': i, 'y_true': i % 2, 'y_pred': 1, 'Accuracy': i / 10} for i in range(10) if recorder.wants(i)]
+    for row in rows:
+        recorder.record(row)
+    recorder.close()
+
+    assert recorder.path == result_dir.joinpath(f'curve.{curve_format}')
+    assert list(curve_files(result_dir)) == [('curve', recorder.path)]
+    pd.testing.assert_frame_equal(read_curve(recorder.path), pd.DataFrame(rows), check_dtype=False)
+    recorder.path.unlink()
+
+
+def test_curve_checkpoints():
+    assert CurveRecording(log_points=4).checkpoints(1000) == {0, 9, 99, 999}
+    assert CurveRecording(log_points=4).checkpoints(0) is None
+    assert CurveRecording().checkpoints(1000) is None
+
+
+def test_comparison_incremental_recording(result_dir):
+    classifiers = [('GNB', lambda n_inputs, n_classes: GaussianNB())]
+    process_incremental_comparison([RandomDataset()], classifiers, result_dir,
+                                   recording=CurveRecording(interval=10, format='npz'))
+    curve = read_curve(result_dir.joinpath('incremental', 'result', 'GNB', 'RandomDataset.npz'))
+    # every 10th sample and the last one
+    assert curve['index'].tolist() == [10, 20, 30, 40, 50, 60, 70, 80, 90, 99]
+    summary = pd.read_csv(result_dir.joinpath('comparison.csv'))
+    assert curve['Accuracy'].iloc[-1] == pytest.approx(summary['Accuracy'].iloc[0])
+
+    process_comparison_results_incremental_plots(result_dir)
+    assert result_dir.joinpath('incremental', 'plot', 'RandomDataset_accuracy.png').exists()
+
+
+@pytest.mark.parametrize("labels", [[True, False], [0, 1, 2], ['a', 'b', 'c']])
+def test_prequential_curves(labels):
+    rng = np.random.default_rng(1)
+    y_true = rng.choice(labels, 500).tolist()
+    y_pred = rng.choice(labels, 500).tolist()
+    metrics = [river_metrics.Accuracy(), river_metrics.Precision(), river_metrics.Recall(), river_metrics.F1(),
+               river_metrics.FBeta(beta=2), river_metrics.ROCAUC()]
+    curves = PrequentialCurves(metrics)
+    assert set(curves.vectorized) == {0, 1, 2, 3, 4}
+
+    expected = {idx: [] for idx in curves.vectorized}
+    for yt, yp in zip(y_true, y_pred):
+        for idx in curves.vectorized:
+            metrics[idx].update(yt, yp)
+            expected[idx].append(metrics[idx].get())
+
+    values = {idx: [] for idx in curves.vectorized}
+    for start in range(0, 500, 64):
+        for idx, chunk_values in curves.update(y_true[start:start + 64], y_pred[start:start + 64]).items():
+            values[idx].extend(chunk_values)
+    assert values == expected
+    assert curves.values == {idx: v[-1] for idx, v in expected.items()}
+
+
+def test_lttb():
+    x = np.arange(10000)
+    y = np.sin(x / 500)
+    y[5003] = 10
+    indexes = lttb(x, y, 100)
+    assert len(indexes) == 100
+    assert indexes[0] == 0 and indexes[-1] == 9999
+    assert np.all(np.diff(indexes) > 0)
+    # peak is preserved
+    assert 5003 in indexes
+    assert lttb(x[:50], y[:50], 100).tolist() == list(range(50))
+
+
+def test_read_downsampled_curve(result_dir):
+    path = result_dir.joinpath('curve.csv')
+    cache_path = result_dir.joinpath('downsampled', 'curve.npz')
+    pd.DataFrame({'index': np.arange(1, 1001), 'Accuracy': np.linspace(0, 1, 1000), 'F1': np.ones(1000)}).to_csv(
+        path, index=False)
+
+    curves = read_downsampled_curve(path, cache_path, ['Accuracy', 'F1'], 50)
+    assert cache_path.exists()
+    assert len(curves['Accuracy']) == 50
+    assert curves['F1']['index'].iloc[-1] == 1000
+
+    cached = read_downsampled_curve(path, cache_path, ['Accuracy'], 50)
+    pd.testing.assert_frame_equal(cached['Accuracy'], curves['Accuracy'])
+    assert len(read_downsampled_curve(path, cache_path, ['Accuracy'], 20)['Accuracy']) == 20
+    assert len(read_downsampled_curve(path, cache_path, ['Accuracy'], None)['Accuracy']) == 1000
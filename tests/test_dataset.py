@@ -3,7 +3,7 @@ from pathlib import Path
 import numpy as np
 
 from cacp import all_datasets, LocalClassificationDataset
-from cacp.dataset import LocalCsvClassificationDataset
+from cacp.dataset import LocalCsvClassificationDataset, dataset_profile
 from cacp_examples.example_custom_datasets.random_dataset import RandomDataset
 
 
@@ -136,3 +136,79 @@ def test_dataset_iter_seed(datasets):
         y_array_3.append(y)
 
     assert y_array_1 != y_array_3
+
+
+def test_dataset_folds_cache(datasets):
+    ds = datasets[0]
+    parsed_folds = list(ds.folds(n_folds=5))
+    cached_folds = list(ds.folds(n_folds=5))
+
+    assert len(cached_folds) == 5
+    for parsed_fold, cached_fold in zip(parsed_folds, cached_folds):
+        assert isinstance(cached_fold.x_train, np.memmap)
+        assert parsed_fold.index == cached_fold.index
+        assert np.array_equal(parsed_fold.labels, cached_fold.labels)
+        assert np.array_equal(parsed_fold.x_train, cached_fold.x_train)
+        assert np.array_equal(parsed_fold.y_train, cached_fold.y_train)
+        assert np.array_equal(parsed_fold.x_test, cached_fold.x_test)
+        assert np.array_equal(parsed_fold.y_test, cached_fold.y_test)
+
+
+def test_dataset_profile(datasets):
+    ds = datasets[0]
+    profile = ds.profile()
+    assert profile.instances == 150
+    assert profile.features == 4
+    assert profile.classes == 3
+    assert set(profile.class_counts) == {0, 1, 2}
+    assert profile.dtypes == ['real'] * 4
+    assert ds.profile() is profile
+
+
+def test_local_dataset_profile(monkeypatch, tmp_path):
+    # parsed folds of local datasets are cached in home directory
+    monkeypatch.setenv('HOME', str(tmp_path))
+    ds_path = Path(__file__).parent.parent. \
+        joinpath('cacp_examples') \
+        .joinpath('example_custom_datasets') \
+        .joinpath('local_dataset')
+    ds = LocalClassificationDataset('iris', ds_path)
+    monkeypatch.setattr(ds, 'folds', None)
+    profile = ds.profile()
+    assert profile.instances == 150
+    assert profile.features == 4
+    assert profile.class_counts == {0: None, 1: None, 2: None}
+
+    labels = np.concatenate([fold.y_test for fold in LocalClassificationDataset('iris', ds_path).folds()])
+    profile = LocalClassificationDataset('iris', ds_path).profile()
+    assert profile.class_counts == {0: 50, 1: 50, 2: 50}
+    assert set(profile.class_counts) == set(labels.tolist())
+
+    ds = LocalClassificationDataset('iris', ds_path)
+    monkeypatch.setattr(ds, 'folds', None)
+    assert ds.profile() == profile
+
+
+def test_custom_dataset_profile():
+    profile = dataset_profile(RandomDataset())
+    assert profile.instances == 100
+    assert profile.features == 5
+    assert profile.classes == 2
+    assert sum(profile.class_counts.values()) == 100
+    assert set(profile.class_counts) == {0, 1}
+
+
+def test_custom_dataset_stream():
+    ds = RandomDataset()
+    stream = ds.stream()
+    assert len(stream) == 100
+    assert ds.stream() is stream
+    samples = list(ds)
+    assert len(samples) == 100
+    assert list(samples[0][0].keys()) == [0, 1, 2, 3, 4]
+    assert [y for _, y in samples] == stream.y.tolist()
+
+    stream.chunk_size = 7
+    assert list(stream) == samples
+    ds.release_stream()
+    assert ds.stream() is not stream
@@ -0,0 +1,23 @@
+from sklearn.svm import SVC
+
+from cacp.halving import ClassifierGrid, GridVariant, SuccessiveHalving
+
+
+def test_classifier_grid_variants():
+    classifiers = ClassifierGrid('SVC', SVC, {'C': [1, 10], 'kernel': ['rbf', 'linear']},
+                                 fixed_params={'probability': True}).classifiers()
+    names = [c_n for c_n, _ in classifiers]
+    assert names == ['SVC(C=1,kernel=rbf)', 'SVC(C=1,kernel=linear)', 'SVC(C=10,kernel=rbf)',
+                     'SVC(C=10,kernel=linear)']
+    model = classifiers[3][1](4, 3)
+    assert isinstance(classifiers[3][1], GridVariant)
+    assert model.C == 10 and model.kernel == 'linear' and model.probability
+
+
+def test_successive_halving_rungs():
+    halving = SuccessiveHalving(factor=3)
+    assert halving.rungs(2, 10) == [10]
+    assert halving.rungs(9, 10) == [4, 10]
+    assert halving.rungs(27, 10) == [2, 4, 10]
+    assert halving.rungs(100, 5) == [2, 5]
+    assert SuccessiveHalving(factor=2, min_folds=2).rungs(16, 10) == [3, 5, 10]
@@ -0,0 +1,36 @@
+from cacp.journal import ResultJournal
+
+
+def test_journal_append_and_rows(result_dir):
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm', 'CV index'])
+    journal.clear()
+    journal.append({'Dataset': 'iris', 'Algorithm': 'SVC', 'CV index': 1, 'AUC': 0.9})
+    journal.append({'Dataset': 'iris', 'Algorithm': 'DT', 'CV index': 1, 'AUC': 0.8})
+
+    rows = list(journal.rows())
+    assert len(rows) == 2
+    assert {journal.key(row) for row in rows} == {('iris', 'SVC', 1), ('iris', 'DT', 1)}
+
+
+def test_journal_skips_incomplete_line(result_dir):
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm'])
+    journal.clear()
+    journal.append({'Dataset': 'iris', 'Algorithm': 'SVC'})
+    with journal.path.open('a') as f:
+        f.write('{"Dataset": "iris", "Algo')
+    journal.append({'Dataset': 'iris', 'Algorithm': 'DT'})
+
+    assert [journal.key(row) for row in journal.rows()] == [('iris', 'SVC'), ('iris', 'DT')]
+
+
+def test_journal_settings(result_dir):
+    journal = ResultJournal(result_dir.joinpath('comparison_journal.jsonl'), ['Dataset', 'Algorithm'])
+    journal.open({'n_folds': 10}, resume=False)
+    journal.append({'Dataset': 'iris', 'Algorithm': 'SVC'})
+
+    journal.open({'n_folds': 10}, resume=True)
+    assert journal.keys() == {('iris', 'SVC')}
+
+    journal.open({'n_folds': 5}, resume=True)
+    assert journal.keys() == set()
+    assert journal.settings() == {'n_folds': 5}
@@ -0,0 +1,56 @@
+import os
+import time
+
+import numpy as np
+
+from cacp.limit import run_with_limits, TaskStatus, limit_for, _dumps
+
+
+def broken():
+    raise RuntimeError('broken classifier')
+
+
+def test_limit_for():
+    assert limit_for(None, 'SVC') is None
+    assert limit_for(10, 'SVC') == 10
+    assert limit_for({'SVC': 5}, 'SVC') == 5
+    assert limit_for({'SVC': 5}, 'DT') is None
+
+
+def test_run_with_limits_ok():
+    assert run_with_limits(sum, ([1, 2],)) == (TaskStatus.OK, 3)
+    assert run_with_limits(sum, ([1, 2],), time_limit=60) == (TaskStatus.OK, 3)
+
+
+def test_run_with_limits_error():
+    status, _ = run_with_limits(broken, ())
+    assert status == TaskStatus.ERROR
+    status, _ = run_with_limits(broken, (), time_limit=60)
+    assert status == TaskStatus.ERROR
+
+
+def test_run_with_limits_timeout():
+    start = time.time()
+    status, _ = run_with_limits(time.sleep, (30,), time_limit=1)
+    assert status == TaskStatus.TIMEOUT
+    assert time.time() - start < 30
+
+
+def test_run_with_limits_reuses_process():
+    _, pid = run_with_limits(os.getpid, (), time_limit=60)
+    assert pid != os.getpid()
+    assert run_with_limits(os.getpid, (), time_limit=60) == (TaskStatus.OK, pid)
+
+    status, _ = run_with_limits(time.sleep, (30,), time_limit=1)
+    assert status == TaskStatus.TIMEOUT
+    status, new_pid = run_with_limits(os.getpid, (), time_limit=60)
+    assert status == TaskStatus.OK and new_pid != pid
+
+
+def test_run_with_limits_memmap_reference(result_dir):
+    path = result_dir.joinpath('array.npy')
+    np.save(path, np.arange(1000000, dtype=float))
+    array = np.load(path, mmap_mode='r')
+    # memory-mapped array is sent as reference to its file, not as copy of its data
+    assert len(_dumps(array)) < 10000
+    assert run_with_limits(np.sum, (array,), time_limit=60) == (TaskStatus.OK, array.sum())
@@ -0,0 +1,66 @@
+import joblib
+import numpy as np
+import pytest
+
+from cacp.dataset import ClassificationFoldData
+from cacp.parallel import SharedFoldStore, resolve_n_jobs, prefetch, balance_workers
+
+
+def test_resolve_n_jobs():
+    assert resolve_n_jobs(4, 2) == 2
+    assert resolve_n_jobs(2, 10) == 2
+    assert resolve_n_jobs(None, 1) == 1
+    assert resolve_n_jobs(-1, 0) == 1
+
+
+def test_balance_workers():
+    cpu_count = joblib.cpu_count()
+    assert balance_workers(1, None, 10) == (1, cpu_count)
+    assert balance_workers(None, cpu_count, 10) == (1, cpu_count)
+    assert balance_workers(2, 3, 10) == (2, 3)
+    n_workers, threads = balance_workers(None, None, 10)
+    assert n_workers * threads <= cpu_count
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_prefetch(depth):
+    assert list(prefetch(range(10), depth)) == list(range(10))
+
+
+def test_prefetch_error():
+    def items():
+        yield 1
+        raise ValueError('broken dataset')
+
+    with pytest.raises(ValueError):
+        list(prefetch(items(), 2))
+
+
+def test_shared_fold_store():
+    fold = ClassificationFoldData(
+        index=1,
+        labels=np.array([0, 1]),
+        x_train=np.random.rand(10, 3),
+        y_train=np.random.choice(2, 10),
+        x_test=np.random.rand(5, 3),
+        y_test=np.array(['a', 'b', 'a', 'b', 'a'], dtype=object),
+    )
+    with SharedFoldStore() as store:
+        shared_fold, fold_dir = store.share(fold)
+        assert isinstance(shared_fold.x_train, np.memmap)
+        assert np.array_equal(shared_fold.x_train, fold.x_train)
+        assert np.array_equal(shared_fold.y_test, fold.y_test)
+        assert fold_dir.exists()
+        store.release(fold_dir)
+        assert not fold_dir.exists()
+
+
+def test_shared_fold_store_disabled():
+    fold = ClassificationFoldData(
+        index=1, labels=np.array([0]), x_train=np.zeros((1, 1)), y_train=np.zeros(1),
+        x_test=np.zeros((1, 1)), y_test=np.zeros(1)
+    )
+    with SharedFoldStore(enabled=False) as store:
+        shared_fold, fold_dir = store.share(fold)
+        assert shared_fold is fold
+        assert fold_dir is None
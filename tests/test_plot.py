@@ -33,3 +33,23 @@ def test_plot_incremental(result_dir_with_incremental_data):
     for dataset_name in dataset_names:
         for metric in metrics:
             assert plot_dir.joinpath(f'{dataset_name}_{metric}.png').exists()
+
+
+def test_plot_formats(result_dir_with_data):
+    plot_dir = result_dir_with_data.joinpath('plot')
+
+    process_comparison_results_plots(result_dir_with_data, formats=[])
+    assert not plot_dir.exists()
+
+    process_comparison_results_plots(result_dir_with_data, formats=['svg'], n_jobs=1)
+    metric = DEFAULT_METRICS[0][0].lower()
+    svg_path = plot_dir.joinpath(f'comparison_{metric}_per_fold.svg')
+    assert svg_path.exists()
+    assert not plot_dir.joinpath(f'comparison_{metric}_per_fold.png').exists()
+
+    modified = svg_path.stat().st_mtime_ns
+    process_comparison_results_plots(result_dir_with_data, formats=['svg'], n_jobs=1)
+    assert svg_path.stat().st_mtime_ns == modified
+
+    process_comparison_results_plots(result_dir_with_data, formats=['svg'], n_jobs=1, skip_up_to_date=False)
+    assert svg_path.stat().st_mtime_ns > modified
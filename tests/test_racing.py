@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from sklearn.dummy import DummyClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from cacp import run_experiment, Racing
+from cacp.racing import race_step, process_racing_results, RacingElimination
+from cacp_examples.example_custom_datasets.random_dataset import RandomDataset
+
+
+def _results(means: dict, n_datasets: int = 3, n_folds: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    records = []
+    for dataset in range(n_datasets):
+        for fold in range(1, n_folds + 1):
+            for algorithm, mean in means.items():
+                records.append({'Dataset': f'd{dataset}', 'CV index': fold, 'Algorithm': algorithm,
+                                'AUC': mean + rng.normal(0, 0.01)})
+    return pd.DataFrame(records)
+
+
+def test_race_step_eliminates_worse_classifier():
+    eliminated = race_step(_results({'A': 0.9, 'B': 0.7, 'C': 0.5}), 'AUC', alpha=0.05, min_blocks=5)
+    assert set(eliminated) == {'B', 'C'}
+
+
+def test_race_step_requires_min_blocks():
+    df = _results({'A': 0.9, 'C': 0.5}, n_datasets=1, n_folds=3)
+    assert race_step(df, 'AUC', alpha=0.05, min_blocks=5) == {}
+
+
+def test_run_experiment_racing(result_dir):
+    classifiers = [
+        ('DT', lambda n_inputs, n_classes: DecisionTreeClassifier(random_state=1)),
+        ('Dummy', lambda n_inputs, n_classes: DummyClassifier(strategy='constant', constant=0)),
+    ]
+    run_experiment([RandomDataset()], classifiers, result_dir, n_folds=5, n_jobs=1,
+                   racing=Racing(metric='Accuracy', min_blocks=2), plot_formats=[])
+
+    racing = pd.read_csv(result_dir.joinpath('racing', 'racing.csv'), index_col=0)
+    assert racing['Algorithm'].tolist() == ['DT', 'Dummy']
+    assert racing['Status'].isin(['finished', 'eliminated']).all()
+    assert result_dir.joinpath('racing', 'racing.tex').exists()
+
+
+def test_process_racing_results(result_dir):
+    process_racing_results([RacingElimination('B', 2, 6, 0.01)], ['A', 'B'], 10, result_dir, 'AUC')
+
+    racing = pd.read_csv(result_dir.joinpath('racing', 'racing.csv'), index_col=0)
+    assert racing['Status'].tolist() == ['finished', 'eliminated']
+    assert pd.isna(racing['Step'].iloc[0]) and racing['Step'].iloc[1] == 2
+    tex = result_dir.joinpath('racing', 'racing.tex').open().read()
+    assert 'eliminated' in tex and '-' in tex
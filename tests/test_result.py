@@ -1,4 +1,4 @@
-from cacp.result import process_comparison_results
+from cacp.result import comparison_results, process_comparison_results
 
 
 def test_comparison_results(result_dir_with_data, golden_result_dir):
@@ -9,3 +9,14 @@ def test_comparison_results(result_dir_with_data, golden_result_dir):
 
     assert result_dir_with_data.joinpath('comparison_result.tex').open().read() == golden_result_dir.joinpath(
         'comparison_result.tex').open().read()
+
+
+def test_comparison_results_loaded(result_dir_with_data, golden_result_dir):
+    df = comparison_results(result_dir_with_data)
+    result_dir_with_data.joinpath('comparison.csv').unlink()
+    assert comparison_results(result_dir_with_data, df) is df
+
+    process_comparison_results(result_dir_with_data, df=df)
+
+    assert result_dir_with_data.joinpath('comparison_result.csv').open().read() == golden_result_dir.joinpath(
+        'comparison_result.csv').open().read()
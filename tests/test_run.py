@@ -21,8 +21,8 @@ def test_run_happy_path(datasets, classifiers, result_dir):
 
     assert png_file_count == 10
     assert eps_file_count == 10
-    assert csv_file_count == 29
-    assert tex_file_count == 28
+    assert csv_file_count == 34
+    assert tex_file_count == 33
 
 
 def test_run_happy_path_custom_metric(datasets, classifiers, result_dir):
@@ -40,8 +40,8 @@ def test_run_happy_path_custom_metric(datasets, classifiers, result_dir):
 
     assert png_file_count == 2
     assert eps_file_count == 2
-    assert csv_file_count == 13
-    assert tex_file_count == 12
+    assert csv_file_count == 14
+    assert tex_file_count == 13
 
 
 def test_run_incremental_happy_path(incremental_datasets, incremental_classifiers, result_dir):
@@ -54,5 +54,5 @@ def test_run_incremental_happy_path(incremental_datasets, incremental_classifier
 
     assert png_file_count == 70
     assert eps_file_count == 70
-    assert csv_file_count == 38
-    assert tex_file_count == 28
+    assert csv_file_count == 43
+    assert tex_file_count == 33
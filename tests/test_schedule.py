@@ -0,0 +1,31 @@
+import pandas as pd
+
+from cacp.schedule import TaskCostEstimator
+
+
+class SizedDataset:
+    def __init__(self, name: str, instances: int, features: int):
+        self.name = name
+        self.instances = instances
+        self.features = features
+
+
+def test_cost_estimator_history():
+    history = pd.DataFrame({
+        'Dataset': ['a', 'a', 'b'],
+        'Algorithm': ['SVC', 'DT', 'SVC'],
+        'Train time [s]': [4.0, 1.0, 2.0],
+        'Prediction time [s]': [1.0, 0.0, 0.0],
+    })
+    datasets = [SizedDataset('a', 100, 10), SizedDataset('b', 100, 10)]
+    costs = TaskCostEstimator([history]).costs(datasets, ['SVC', 'DT'])
+    assert costs[('a', 'SVC')] == 5.0
+    assert costs[('a', 'DT')] == 1.0
+    # classifier not timed on dataset uses its average time
+    assert costs[('b', 'DT')] == 1.0
+
+
+def test_cost_estimator_dataset_size():
+    datasets = [SizedDataset('small', 10, 2), SizedDataset('large', 1000, 20)]
+    costs = TaskCostEstimator().costs(datasets, ['SVC'])
+    assert costs[('large', 'SVC')] > costs[('small', 'SVC')]
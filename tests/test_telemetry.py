@@ -0,0 +1,53 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from cacp.telemetry import ResourceMonitor, model_size_mb, CPU_USER_TIME, PEAK_MEMORY
+
+
+def test_resource_monitor():
+    with ResourceMonitor() as monitor:
+        np.linalg.inv(np.random.rand(200, 200) + np.eye(200) * 200)
+    columns = monitor.columns()
+    assert columns[CPU_USER_TIME] >= 0
+    assert columns[PEAK_MEMORY] >= 0
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='per thread CPU time is measured on Linux')
+def test_resource_monitor_task_only():
+    data = np.ones(50 * 1024 * 1024 // 8)
+    with ResourceMonitor() as monitor:
+        pass
+    # memory allocated before entering context is not reported
+    assert monitor.columns()[PEAK_MEMORY] < 25
+    with ResourceMonitor() as monitor:
+        task_data = np.ones(50 * 1024 * 1024 // 8)
+    assert monitor.columns()[PEAK_MEMORY] > 25
+    del data, task_data
+
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            pass
+
+    thread = threading.Thread(target=busy)
+    thread.start()
+    try:
+        with ResourceMonitor() as monitor:
+            time.sleep(0.5)
+    finally:
+        stop.set()
+        thread.join()
+    # CPU time of other threads is not counted
+    assert monitor.columns()[CPU_USER_TIME] < 0.25
+
+
+def test_model_size():
+    model = DecisionTreeClassifier().fit(np.random.rand(20, 2), np.arange(20) % 2)
+    assert model_size_mb(model) > 0
+    assert np.isnan(model_size_mb(lambda x: x))
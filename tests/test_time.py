@@ -1,3 +1,5 @@
+import pandas as pd
+
 from cacp.time import process_times
 
 
@@ -9,3 +11,13 @@ def test_time(result_dir_with_data, golden_result_dir):
 
     assert result_dir_with_data.joinpath('time').joinpath('comparison.tex').open().read() == golden_result_dir.joinpath(
         'time').joinpath('comparison.tex').open().read()
+
+
+def test_time_threads(result_dir_with_data):
+    df = pd.read_csv(result_dir_with_data.joinpath('comparison.csv'))
+    df['Threads'] = 2
+    process_times(result_dir_with_data, df=df)
+
+    time_df = pd.read_csv(result_dir_with_data.joinpath('time').joinpath('comparison.csv'))
+    assert list(time_df.columns) == ['Algorithm', 'Train time [s]', 'Prediction time [s]', 'Threads']
+    assert (time_df['Threads'] == 2).all()
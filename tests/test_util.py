@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, \
+    matthews_corrcoef as sk_matthews_corrcoef
+
+from cacp.util import accuracy, precision, recall, f1, auc, auc_score, matthews_corrcoef, MetricContext, \
+    context_metric
+
+REFERENCE_METRICS = (
+    (accuracy, lambda y_true, y_pred, labels: accuracy_score(y_true, y_pred)),
+    (precision, lambda y_true, y_pred, labels: precision_score(y_true, y_pred, average='weighted', labels=labels,
+                                                               zero_division=0)),
+    (recall, lambda y_true, y_pred, labels: recall_score(y_true, y_pred, average='weighted', labels=labels,
+                                                         zero_division=0)),
+    (f1, lambda y_true, y_pred, labels: f1_score(y_true, y_pred, average='weighted', labels=labels,
+                                                 zero_division=0)),
+    (auc, lambda y_true, y_pred, labels: auc_score(y_true, y_pred, average='weighted', multi_class='ovo',
+                                                   labels=labels)),
+    (matthews_corrcoef, lambda y_true, y_pred, labels: sk_matthews_corrcoef(y_true, y_pred)),
+)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3, 5])
+def test_metrics_match_sklearn(n_classes):
+    rng = np.random.default_rng(1)
+    labels = np.arange(n_classes)
+    y_true = np.concatenate([labels, rng.choice(labels, 50)])
+    y_pred = rng.choice(labels, len(y_true))
+    context = MetricContext(y_true, y_pred, labels)
+    for metric, reference in REFERENCE_METRICS:
+        expected = reference(y_true, y_pred, labels)
+        assert metric(y_true, y_pred, labels) == pytest.approx(expected)
+        assert metric.from_context(context) == pytest.approx(expected)
+
+
+def test_metrics_prediction_outside_labels():
+    labels = np.array([0, 1, 2])
+    y_true = np.array([0, 1, 2, 1])
+    y_pred = np.array([0, 1, 7, 1])
+    assert MetricContext(y_true, y_pred, labels).confusion_matrix is None
+    assert accuracy(y_true, y_pred, labels) == pytest.approx(0.75)
+
+
+def test_context_metric():
+    @context_metric
+    def errors(context: MetricContext) -> float:
+        return float(context.confusion_matrix.sum() - context.true_positives.sum())
+
+    assert errors(np.array([0, 1, 1]), np.array([0, 0, 1]), np.array([0, 1])) == 1.
@@ -1,4 +1,10 @@
-from cacp.wilcoxon import process_wilcoxon
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import wilcoxon
+
+from cacp.result import comparison_results
+from cacp.wilcoxon import process_wilcoxon, process_wilcoxon_for_metric, wilcoxon_matrix
 
 CLASSIFIERS = [
     ('XGB', lambda n_inputs, n_classes: None),  # mock this only for tests
@@ -25,3 +31,33 @@ def test_wilcoxon(result_dir_with_data, golden_result_dir):
     ]:
         for expected_file in expected_winner_dir.glob('*'):
             assert result_winner_dir.joinpath(expected_file.name).exists()
+
+
+def test_wilcoxon_matrix(result_dir_with_data):
+    process_wilcoxon(CLASSIFIERS, result_dir_with_data)
+    df = comparison_results(result_dir_with_data)
+    matrix = pd.read_csv(result_dir_with_data.joinpath('wilcoxon', 'auc', 'matrix.csv'), index_col='Algorithm')
+
+    assert sorted(matrix.index) == sorted(name for name, _ in CLASSIFIERS)
+    assert np.isnan(np.diag(matrix.values)).all()
+    # rows order of results does not matter
+    shuffled = wilcoxon_matrix(df.sample(frac=1, random_state=1), 'AUC')
+    np.testing.assert_allclose(shuffled.loc[matrix.index, matrix.columns], matrix.values)
+    per_classifier = process_wilcoxon_for_metric('DT', 'AUC', result_dir_with_data, df)
+    np.testing.assert_allclose(per_classifier['p-value'], matrix.loc['DT', per_classifier['Algorithm']])
+
+
+def test_wilcoxon_matrix_order():
+    # tied differences make p-value of scipy test depend on order of samples
+    a = [0.25, 0.25, 0.5, 0.75, 0.5, 0.75, 0.25, 0.75, 0.5]
+    b = [0.75, 0.0, 0.75, 0.0, 0.25, 0.25, 0.75, 0.5, 0.0]
+    df = pd.DataFrame({
+        'Dataset': 'd',
+        'CV index': list(range(1, 10)) * 2,
+        'Algorithm': ['A'] * 9 + ['B'] * 9,
+        'AUC': a + b,
+    })
+    matrix = wilcoxon_matrix(df, 'AUC')
+    assert matrix.loc['A', 'B'] == pytest.approx(wilcoxon(a, b)[1])
+    assert matrix.loc['B', 'A'] == pytest.approx(wilcoxon(b, a)[1])
+    assert matrix.loc['A', 'B'] != pytest.approx(matrix.loc['B', 'A'])